@@ -7,27 +7,54 @@ https://github.com/amaharek/muslim_prayer_companion
 
 from __future__ import annotations
 
-from datetime import timedelta
+from importlib import import_module
 from typing import TYPE_CHECKING
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, Platform
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN
-from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+from .const import CALC_METHODS, CONF_CALC_METHOD, DOMAIN, LOGGER
+from .storage import cache_key, grid_location
 
-PLATFORMS = [Platform.SENSOR]
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.typing import ConfigType
+
+    from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+
+PLATFORMS = [Platform.CALENDAR, Platform.SENSOR]
 CONFIG_SCHEMA = cv.removed(DOMAIN, raise_if_present=False)
 
 
+async def async_setup(hass: HomeAssistant, _config: ConfigType) -> bool:
+    """Register the services, once for all entries."""
+    services = await hass.async_add_import_executor_job(
+        import_module, f"{__name__}.services"
+    )
+    services.async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up the Muslim Prayer Component."""
-    coordinator = MuslimPrayerCompanionDataUpdateCoordinator(hass)
-    await coordinator.async_config_entry_first_refresh()
+    # The coordinator pulls in numpy and the timetable code, which the config
+    # flow does not need: import it on first setup, off the event loop.
+    coordinator_module = await hass.async_add_import_executor_job(
+        import_module, f"{__name__}.coordinator"
+    )
+    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = (
+        coordinator_module.MuslimPrayerCompanionDataUpdateCoordinator(hass)
+    )
+    if await coordinator.async_restore():
+        # Sensors start from the cached timetable, revalidate in the background.
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} revalidate"
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
 
-    hass.data.setdefault(DOMAIN, coordinator)
+    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = coordinator
     config_entry.async_on_unload(
         config_entry.add_update_listener(async_options_updated)
     )
@@ -36,20 +63,59 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
+    """Migrate an entry to the current version of the config flow."""
+    if config_entry.version == 1:
+        # Version 1 stored the label of the calculation method.
+        label = config_entry.data.get(CONF_CALC_METHOD)
+        data = {**config_entry.data}
+        if label in CALC_METHODS:
+            data[CONF_CALC_METHOD] = CALC_METHODS[label]
+        # The unique id was built from the label too, rebuild it from the method
+        # so that the flow refuses to add the same cell and method again.
+        unique_id = cache_key(
+            *grid_location(
+                data.get(CONF_LATITUDE, hass.config.latitude),
+                data.get(CONF_LONGITUDE, hass.config.longitude),
+            ),
+            data.get(CONF_CALC_METHOD),
+        )
+        duplicate = hass.config_entries.async_entry_for_domain_unique_id(
+            DOMAIN, unique_id
+        )
+        if duplicate is not None and duplicate.entry_id != config_entry.entry_id:
+            LOGGER.error(
+                "Cannot migrate %s, %s already uses the same location and method",
+                config_entry.entry_id,
+                duplicate.entry_id,
+            )
+            return False
+        hass.config_entries.async_update_entry(
+            config_entry, data=data, unique_id=unique_id, version=2
+        )
+        LOGGER.debug("Migrated %s to version 2", config_entry.entry_id)
+    return True
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload Muslim Prayer entry from config_entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     ):
-        coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data.pop(DOMAIN)
+        coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN].pop(
+            config_entry.entry_id
+        )
         if coordinator.event_unsub:
             coordinator.event_unsub()
+        await coordinator.async_shutdown()
     return unload_ok
 
 
 async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Triggered by config entry options updates."""
-    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN]
+    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN][
+        entry.entry_id
+    ]
     if coordinator.event_unsub:
         coordinator.event_unsub()
     await coordinator.async_request_refresh()
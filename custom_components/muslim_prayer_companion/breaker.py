@@ -0,0 +1,67 @@
+"""
+Per source circuit breakers for the Muslim Prayer Companion.
+
+A source that fails is not queried again until a backoff delay has passed.
+The delay doubles with each consecutive failure and is jittered, so an
+outage of a mosque site does not turn into a retry storm, while the last
+good data keeps being served, marked as stale.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from random import SystemRandom
+from typing import Final
+
+import homeassistant.util.dt as dt_util
+
+# Backoff after the first failure, doubled after each following one.
+BASE_BACKOFF: Final = timedelta(minutes=1)
+MAX_BACKOFF: Final = timedelta(hours=6)
+# Jitter source, seeded by the system rather than shared with other users.
+_RANDOM: Final = SystemRandom()
+
+
+class CircuitBreaker:
+    """Failure tracking and exponential backoff of a single source."""
+
+    __slots__ = ("failures", "last_failure", "last_success", "name", "retry_at")
+
+    def __init__(self, name: str) -> None:
+        """Initialize a closed breaker."""
+        self.name = name
+        self.failures = 0
+        self.retry_at: datetime | None = None
+        self.last_success: datetime | None = None
+        self.last_failure: datetime | None = None
+
+    @property
+    def stale(self) -> bool:
+        """Return whether the last request to the source failed."""
+        return self.failures > 0
+
+    def allow_request(self) -> bool:
+        """Return whether the source may be queried now."""
+        return self.retry_at is None or dt_util.utcnow() >= self.retry_at
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        self.failures = 0
+        self.retry_at = None
+        self.last_success = dt_util.utcnow()
+
+    def record_failure(self) -> timedelta:
+        """
+        Open the breaker after a failed request.
+
+        Returns:
+            timedelta: Delay before the source may be queried again
+
+        """
+        self.failures += 1
+        backoff = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (self.failures - 1))
+        # Equal jitter: at least half of the backoff, so retries stay spread.
+        delay = backoff * _RANDOM.uniform(0.5, 1)
+        self.last_failure = dt_util.utcnow()
+        self.retry_at = self.last_failure + delay
+        return delay
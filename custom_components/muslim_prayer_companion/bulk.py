@@ -0,0 +1,150 @@
+"""
+Bulk refresh of many timetable sources for the Muslim Prayer Companion.
+
+An instance may follow hundreds of congregations. Their HTTP requests all go
+through one ``FetchLimiter``, which bounds the requests in flight overall and
+per host, so neither the event loop nor a single mosque website is flooded.
+``async_bulk_refresh`` starts the refresh jobs evenly spread over a window
+and reports the throughput and tail latency of the run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Final, NamedTuple, TypeVar
+from urllib.parse import urlsplit
+
+import numpy as np
+from aiohttp import ClientError
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import LOGGER
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
+_T = TypeVar("_T")
+
+# Requests in flight at once, overall and to a single host.
+MAX_CONCURRENCY: Final = 32
+HOST_CONCURRENCY: Final = 2
+
+
+class FetchLimiter:
+    """One semaphore for all the requests, plus one per host."""
+
+    def __init__(
+        self, limit: int = MAX_CONCURRENCY, host_limit: int = HOST_CONCURRENCY
+    ) -> None:
+        """Initialize the limiter."""
+        self._semaphore = asyncio.Semaphore(limit)
+        self._hosts: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(host_limit)
+        )
+
+    def limit(
+        self, fetch: Callable[..., Awaitable[_T]]
+    ) -> Callable[..., Awaitable[_T]]:
+        """
+        Wrap a request function taking the URL first.
+
+        The function is e.g. a partial of get_json_response_if_modified.
+
+        Args:
+            fetch (Callable): Coroutine function called as fetch(url, *args)
+
+        Returns:
+            Callable: Same function, waiting for a free slot before each request
+
+        """
+
+        async def limited(url: str, *args: object) -> _T:
+            # The host slot first, so a slow site does not hold the shared slots.
+            async with self._hosts[urlsplit(url).hostname or ""], self._semaphore:
+                return await fetch(url, *args)
+
+        return limited
+
+
+class RefreshReport(NamedTuple):
+    """Outcome of a bulk refresh."""
+
+    refreshed: int
+    failed: int
+    seconds: float
+    # Latencies of a single job in seconds, waiting for a slot included.
+    p50: float
+    p99: float
+
+    @property
+    def per_second(self) -> float:
+        """Return the jobs completed per second."""
+        total = self.refreshed + self.failed
+        return total / self.seconds if self.seconds else float(total)
+
+
+def spread_delays(count: int, window: float, phase: float = 0.0) -> list[float]:
+    """
+    Return start delays spacing count jobs evenly over a window.
+
+    Args:
+        count (int): Number of jobs
+        window (float): Seconds over which the jobs start
+        phase (float): Fraction of the spacing added to every delay, 0 to 1
+
+    Returns:
+        list: Delay in seconds of every job
+
+    """
+    spacing = window / count if count else 0.0
+    return [(index + phase) * spacing for index in range(count)]
+
+
+async def async_bulk_refresh(
+    jobs: Sequence[Callable[[], Awaitable[bool]]],
+    window: float = 0.0,
+    phase: float = 0.0,
+) -> RefreshReport:
+    """
+    Run refresh jobs spread evenly over a window.
+
+    Args:
+        jobs (Sequence): Coroutine functions returning whether the refresh worked
+        window (float): Seconds over which the jobs start, 0 to start them at once
+        phase (float): Fraction of the spacing the first job is delayed by
+
+    Returns:
+        RefreshReport: Counts, duration and latency percentiles of the run
+
+    """
+    latencies = np.zeros(len(jobs))
+
+    async def run(index: int, job: Callable[[], Awaitable[bool]], delay: float) -> bool:
+        if delay:
+            await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            return await job()
+        except (ClientError, HomeAssistantError, TimeoutError) as e:
+            LOGGER.debug(f"Bulk refresh job failed: {e}")
+            return False
+        finally:
+            latencies[index] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            run(index, job, delay)
+            for index, (job, delay) in enumerate(
+                zip(jobs, spread_delays(len(jobs), window, phase), strict=True)
+            )
+        )
+    )
+    seconds = time.perf_counter() - started
+    refreshed = sum(1 for result in results if result)
+    p50, p99 = np.percentile(latencies, (50, 99)) if len(jobs) else (0.0, 0.0)
+    return RefreshReport(
+        refreshed, len(jobs) - refreshed, seconds, float(p50), float(p99)
+    )
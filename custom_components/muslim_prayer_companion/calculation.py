@@ -0,0 +1,318 @@
+"""
+Local astronomical prayer-time calculation for the Muslim Prayer Companion.
+
+The formulas follow the widely used PrayTimes algorithm, which is also what
+the aladhan.com API (used by ``prayer_times_calculator``) runs server side,
+so results match the previous network based values to the minute. Every
+helper works on NumPy arrays, so a whole range of days is computed in one
+vectorized pass.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Final
+
+import numpy as np
+
+from .const import TIMETABLE_PRAYERS
+from .dst import utc_offset_minutes
+from .timetable import MISSING, Timetable
+
+if TYPE_CHECKING:
+    from datetime import date, tzinfo
+
+# Sun altitude at sunrise/sunset, accounting for refraction and the solar disc.
+SUNRISE_ANGLE: Final = 0.833
+# Imsak is a fixed number of minutes before Fajr.
+IMSAK_MINUTES: Final = 10
+
+
+@dataclass(frozen=True, slots=True)
+class MethodParams:
+    """Parameters of a calculation method."""
+
+    fajr_angle: float
+    isha_angle: float | None = None
+    isha_minutes: int = 0
+    maghrib_angle: float | None = None
+    asr_factor: int = 1
+    midnight: str = "standard"
+
+
+METHOD_PARAMS: Final[dict[str, MethodParams]] = {
+    "jafari": MethodParams(16, 14, maghrib_angle=4, midnight="jafari"),
+    "karachi": MethodParams(18, 18),
+    "isna": MethodParams(15, 15),
+    "mwl": MethodParams(18, 17),
+    "makkah": MethodParams(18.5, isha_minutes=90),
+    "egypt": MethodParams(19.5, 17.5),
+    "tehran": MethodParams(17.7, 14, maghrib_angle=4.5, midnight="jafari"),
+    "gulf": MethodParams(19.5, isha_minutes=90),
+    "kuwait": MethodParams(18, 17.5),
+    "qatar": MethodParams(18, isha_minutes=90),
+    "singapore": MethodParams(20, 18),
+    "france": MethodParams(12, 12),
+    "turkey": MethodParams(18, 17),
+    "russia": MethodParams(16, 15),
+}
+
+# Methods backed by a mosque timetable use ISNA as their reference calculation.
+REFERENCE_METHOD: Final = "isna"
+
+
+def get_method_params(method: str) -> MethodParams:
+    """
+    Return the parameters of a calculation method.
+
+    Args:
+        method (str): Calculation method, a key of METHOD_PARAMS
+
+    Returns:
+        MethodParams: Angles and rules of the method
+
+    Raises:
+        ValueError: If the method is not computed locally
+
+    """
+    try:
+        return METHOD_PARAMS[method]
+    except KeyError:
+        msg = f"unknown calculation method: {method}"
+        raise ValueError(msg) from None
+
+
+# --- Astronomy helpers (degree based, vectorized) ---
+
+
+def _sin(deg: np.ndarray) -> np.ndarray:
+    return np.sin(np.radians(deg))
+
+
+def _cos(deg: np.ndarray) -> np.ndarray:
+    return np.cos(np.radians(deg))
+
+
+def _tan(deg: np.ndarray) -> np.ndarray:
+    return np.tan(np.radians(deg))
+
+
+def _arccos(x: np.ndarray) -> np.ndarray:
+    # Out of range values mean the sun never reaches the angle: NaN.
+    with np.errstate(invalid="ignore"):
+        return np.degrees(np.arccos(x))
+
+
+def _julian_day(target_date: date) -> float:
+    """Return the Julian day at 00:00 UTC of the given date."""
+    return target_date.toordinal() + 1721424.5
+
+
+def _sun_position(jd: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the solar declination and the equation of time for Julian days."""
+    d = jd - 2451545.0
+    g = (357.529 + 0.98560028 * d) % 360
+    q = (280.459 + 0.98564736 * d) % 360
+    ecl_lon = (q + 1.915 * _sin(g) + 0.020 * _sin(2 * g)) % 360
+    obliquity = 23.439 - 0.00000036 * d
+    right_asc = (
+        np.degrees(np.arctan2(_cos(obliquity) * _sin(ecl_lon), _cos(ecl_lon))) / 15
+    )
+    equation = q / 15 - right_asc % 24
+    declination = np.degrees(np.arcsin(_sin(obliquity) * _sin(ecl_lon)))
+    return declination, equation
+
+
+def _mid_day(jd: np.ndarray, portion: float) -> np.ndarray:
+    """Return the solar noon in hours (longitude corrected later)."""
+    _, equation = _sun_position(jd + portion)
+    return (12 - equation) % 24
+
+
+def _sun_angle_time(
+    jd: np.ndarray,
+    latitude: float,
+    angle: float | np.ndarray,
+    portion: float,
+    *,
+    ccw: bool = False,
+) -> np.ndarray:
+    """Return the time at which the sun reaches the given angle below the horizon."""
+    declination, _ = _sun_position(jd + portion)
+    noon = _mid_day(jd, portion)
+    hour_angle = (
+        _arccos(
+            (-_sin(angle) - _sin(declination) * _sin(latitude))
+            / (_cos(declination) * _cos(latitude))
+        )
+        / 15
+    )
+    return noon - hour_angle if ccw else noon + hour_angle
+
+
+def _asr_time(
+    jd: np.ndarray, latitude: float, factor: int, portion: float
+) -> np.ndarray:
+    """Return Asr time for the given shadow factor."""
+    declination, _ = _sun_position(jd + portion)
+    angle = -np.degrees(np.arctan(1 / (factor + _tan(np.abs(latitude - declination)))))
+    return _sun_angle_time(jd, latitude, angle, portion)
+
+
+def _time_diff(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    return (end - start) % 24
+
+
+def _night_portion_fix(
+    time: np.ndarray,
+    base: np.ndarray,
+    angle: float,
+    night: np.ndarray,
+    *,
+    ccw: bool,
+) -> np.ndarray:
+    """Apply the angle based high latitude rule to a twilight time."""
+    portion = angle / 60 * night
+    diff = _time_diff(time, base) if ccw else _time_diff(base, time)
+    fixed = base - portion if ccw else base + portion
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(time) | (diff > portion), fixed, time)
+
+
+def _utc_offsets(start: date, days: int, time_zone: tzinfo) -> np.ndarray:
+    """Return the UTC offset in hours at local noon of every day."""
+    return utc_offset_minutes(start, days, time_zone) / 60
+
+
+def compute_prayer_hours(
+    latitude: float,
+    longitude: float,
+    method: str,
+    start: date,
+    utc_offsets: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Compute the prayer times of consecutive days as fractional local hours.
+
+    Args:
+        latitude (float): Latitude
+        longitude (float): Longitude
+        method (str): Calculation method, a value of const.CALC_METHODS
+        start (date): First day to compute
+        utc_offsets (ndarray): UTC offset in hours of every day to compute
+
+    Returns:
+        dict: Array of fractional local hours per prayer
+
+    """
+    params = get_method_params(method)
+    jd = _julian_day(start) - longitude / (15 * 24) + np.arange(len(utc_offsets))
+
+    fajr = _sun_angle_time(jd, latitude, params.fajr_angle, 5 / 24, ccw=True)
+    sunrise = _sun_angle_time(jd, latitude, SUNRISE_ANGLE, 6 / 24, ccw=True)
+    dhuhr = _mid_day(jd, 12 / 24)
+    asr = _asr_time(jd, latitude, params.asr_factor, 13 / 24)
+    sunset = _sun_angle_time(jd, latitude, SUNRISE_ANGLE, 18 / 24)
+    maghrib = (
+        _sun_angle_time(jd, latitude, params.maghrib_angle, 18 / 24)
+        if params.maghrib_angle is not None
+        else sunset
+    )
+    isha = (
+        _sun_angle_time(jd, latitude, params.isha_angle, 18 / 24)
+        if params.isha_angle is not None
+        else None
+    )
+
+    shift = utc_offsets - longitude / 15
+    fajr, sunrise, dhuhr = fajr + shift, sunrise + shift, dhuhr + shift
+    asr, sunset, maghrib = asr + shift, sunset + shift, maghrib + shift
+
+    night = _time_diff(sunset, sunrise)
+    fajr = _night_portion_fix(fajr, sunrise, params.fajr_angle, night, ccw=True)
+    if isha is not None:
+        isha = _night_portion_fix(
+            isha + shift, sunset, params.isha_angle, night, ccw=False
+        )
+    else:
+        isha = maghrib + params.isha_minutes / 60
+    if params.maghrib_angle is not None:
+        maghrib = _night_portion_fix(
+            maghrib, sunset, params.maghrib_angle, night, ccw=False
+        )
+
+    imsak = fajr - IMSAK_MINUTES / 60
+    if params.midnight == "jafari":
+        midnight = sunset + _time_diff(sunset, fajr) / 2
+    else:
+        midnight = sunset + night / 2
+
+    return {
+        "Fajr": fajr,
+        "Sunrise": sunrise,
+        "Dhuhr": dhuhr,
+        "Asr": asr,
+        "Sunset": sunset,
+        "Maghrib": maghrib,
+        "Isha": isha,
+        "Imsak": imsak,
+        "Midnight": midnight,
+    }
+
+
+def compute_timetable(
+    latitude: float,
+    longitude: float,
+    method: str,
+    start: date,
+    days: int,
+    time_zone: tzinfo,
+) -> Timetable:
+    """
+    Compute the prayer timetable of a range of days in one vectorized pass.
+
+    Args:
+        latitude (float): Latitude
+        longitude (float): Longitude
+        method (str): Calculation method, a value of const.CALC_METHODS
+        start (date): First day of the timetable
+        days (int): Number of days to compute
+        time_zone (tzinfo): Local time zone
+
+    Returns:
+        Timetable: Minutes of the local day per day and prayer
+
+    """
+    hours = compute_prayer_hours(
+        latitude, longitude, method, start, _utc_offsets(start, days, time_zone)
+    )
+    stacked = np.column_stack([hours[prayer] for prayer in TIMETABLE_PRAYERS])
+    missing = np.isnan(stacked)
+    minutes = np.floor(np.where(missing, 0, stacked % 24) * 60 + 0.5) % 1440
+    return Timetable(start, np.where(missing, MISSING, minutes).astype(np.int16))
+
+
+def compute_prayer_times(
+    latitude: float,
+    longitude: float,
+    method: str,
+    target_date: date,
+    time_zone: tzinfo,
+) -> dict[str, str]:
+    """
+    Compute the prayer times of a day in HH:MM local time.
+
+    Args:
+        latitude (float): Latitude
+        longitude (float): Longitude
+        method (str): Calculation method, a value of const.CALC_METHODS
+        target_date (date): Day to compute
+        time_zone (tzinfo): Local time zone
+
+    Returns:
+        dict: Prayer times in format HH:MM
+
+    """
+    return compute_timetable(
+        latitude, longitude, method, target_date, 1, time_zone
+    ).day_times(target_date)
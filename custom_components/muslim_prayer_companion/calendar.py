@@ -0,0 +1,76 @@
+"""Calendar of the Muslim Prayer Companion prayer and iqamah times."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import homeassistant.util.dt as dt_util
+from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, PRAYER_TIMES_ICON
+from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+    from .events import PrayerEvent
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Muslim Prayer Companion calendar platform."""
+    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities([MuslimPrayerCompanionCalendar(coordinator)])
+
+
+def _calendar_event(event: PrayerEvent) -> CalendarEvent:
+    """Convert a prayer event to a calendar event in local time."""
+    start = dt_util.as_local(event.start)
+    end = dt_util.as_local(event.end)
+    description = None
+    if event.iqamah:
+        description = f"Iqamah at {end.strftime('%H:%M')}"
+    return CalendarEvent(
+        start=start, end=end, summary=event.prayer, description=description
+    )
+
+
+class MuslimPrayerCompanionCalendar(
+    CoordinatorEntity[MuslimPrayerCompanionDataUpdateCoordinator], CalendarEntity
+):
+    """Calendar of the prayers, each lasting until its iqamah."""
+
+    _attr_has_entity_name = True
+    _attr_name = "Prayer Times"
+    _attr_icon = PRAYER_TIMES_ICON
+
+    def __init__(self, coordinator: MuslimPrayerCompanionDataUpdateCoordinator) -> None:
+        """Initialize the calendar."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"calendar_{coordinator.config_entry.entry_id}"
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def event(self) -> CalendarEvent | None:
+        """Return the prayer in progress or the next one."""
+        event = self.coordinator.event_index.current_or_next(dt_util.now())
+        return _calendar_event(event) if event else None
+
+    async def async_get_events(
+        self, _hass: HomeAssistant, start_date: datetime, end_date: datetime
+    ) -> list[CalendarEvent]:
+        """Return the prayers between start_date and end_date, without fetching."""
+        return [
+            _calendar_event(event)
+            for event in self.coordinator.event_index.between(start_date, end_date)
+        ]
@@ -0,0 +1,75 @@
+"""
+Request coalescing for the Muslim Prayer Companion.
+
+Identical upstream requests made while one is already in flight share its
+result (single flight), and results are memoized for MAX_AGE seconds, so
+a refresh makes at most one call per key. Each result expires on its own,
+so a refresh of one entry never drops the results memoized for the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Final
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+# Seconds a result is shared for, longer than a refresh of every entry.
+MAX_AGE: Final = 60.0
+
+
+class RequestCoalescer:
+    """Single flight and time limited memoization of keyed coroutines."""
+
+    def __init__(self, max_age: float = MAX_AGE) -> None:
+        """Initialize the coalescer with the seconds results are shared for."""
+        self.max_age = max_age
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        # Result and monotonic expiry time of each key.
+        self._results: dict[Hashable, tuple[Any, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def async_run(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the result of factory() for key, sharing it between callers.
+
+        Args:
+            key (Hashable): Identity of the request, e.g. (lat, lon, method, date)
+            factory (Callable): Creates the coroutine doing the actual request
+
+        Returns:
+            Any: Result of the request
+
+        """
+        memoized = self._results.get(key)
+        if memoized is not None and memoized[1] > time.monotonic():
+            self.hits += 1
+            return memoized[0]
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(partial(self._request_done, key))
+        else:
+            self.hits += 1
+        # Shielded, so a cancelled caller does not cancel the shared request.
+        return await asyncio.shield(task)
+
+    def _request_done(self, key: Hashable, task: asyncio.Future) -> None:
+        """Memoize the result of a finished request, dropping expired ones."""
+        self._in_flight.pop(key, None)
+        now = time.monotonic()
+        self._results = {
+            other: memoized
+            for other, memoized in self._results.items()
+            if memoized[1] > now
+        }
+        if not task.cancelled() and task.exception() is None:
+            self._results[key] = (task.result(), now + self.max_age)
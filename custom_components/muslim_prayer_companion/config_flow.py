@@ -3,26 +3,47 @@
 from __future__ import annotations
 
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
-from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import config_validation as cv
+
+if TYPE_CHECKING:
+    from homeassistant.data_entry_flow import FlowResult
 
 _LOGGER = getLogger(__package__)
 try:
     from .const import (  # DEFAULT_IQAMAH_METHOD,; DEFAULT_IQAMAH_OFFSETS,
-        CALC_METHODS,
+        CALC_METHOD_LABELS,
+        CONF_HIJRI_ADJUSTMENT,
+        CONF_SOURCE_DEADLINE,
         DEFAULT_CALC_METHOD,
+        DEFAULT_HIJRI_ADJUSTMENT,
+        DEFAULT_SOURCE_DEADLINE,
         DOMAIN,
+        NAME,
     )
+    from .storage import cache_key, grid_location
 except ImportError as e:
     _LOGGER.error(f"Error importing constants: {e}")
 
 DATA_SCHEMA = vol.Schema(
     {
         vol.Required("calculation_method", default=DEFAULT_CALC_METHOD): vol.In(
-            CALC_METHODS
+            CALC_METHOD_LABELS
+        ),
+        # Location of the mosque, Home Assistant's location when left empty.
+        vol.Optional(CONF_LATITUDE): cv.latitude,
+        vol.Optional(CONF_LONGITUDE): cv.longitude,
+        # Days added to the Umm al-Qura Hijri date, for local moon sighting.
+        vol.Optional(CONF_HIJRI_ADJUSTMENT, default=DEFAULT_HIJRI_ADJUSTMENT): vol.All(
+            vol.Coerce(int), vol.Range(min=-2, max=2)
+        ),
+        # Seconds to wait for a mosque timetable before using the calculation.
+        vol.Optional(CONF_SOURCE_DEADLINE, default=DEFAULT_SOURCE_DEADLINE): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=30)
         ),
         # vol.Required("iqamah_method", default=DEFAULT_IQAMAH_METHOD): vol.In(["offset", "api"]),
         # For offset-based iqamah, expect a mapping for each prayer. Offsets in minutes.
@@ -43,15 +64,24 @@ DATA_SCHEMA = vol.Schema(
 class MuslimPrayerCompanionConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Muslim Prayer Companion."""
 
-    VERSION = 1
+    # Version 2 stores the calculation method instead of its label.
+    VERSION = 2
 
     async def async_step_user(self, user_input: dict | None = None) -> FlowResult:
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
+            # One entry per grid cell and method, nearby entries would duplicate it.
+            latitude = user_input.get(CONF_LATITUDE, self.hass.config.latitude)
+            longitude = user_input.get(CONF_LONGITUDE, self.hass.config.longitude)
+            method = user_input["calculation_method"]
+            await self.async_set_unique_id(
+                cache_key(*grid_location(latitude, longitude), method)
+            )
+            self._abort_if_unique_id_configured()
             # In a real integration, validate the API endpoints if provided.
             return self.async_create_entry(
-                title="Muslim Prayer Companion", data=user_input
+                title=f"{NAME} ({CALC_METHOD_LABELS[method]})", data=user_input
             )
 
         return self.async_show_form(
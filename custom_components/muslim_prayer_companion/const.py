@@ -10,12 +10,19 @@ NAME: Final = "Muslim Prayer Companion"
 PRAYER_TIMES_ICON: Final = "mdi:calendar-clock"
 
 CONF_CALC_METHOD: Final = "calculation_method"
+CONF_HIJRI_ADJUSTMENT: Final = "hijri_adjustment"  # Days, for local moon sighting.
+DEFAULT_HIJRI_ADJUSTMENT: Final = 0
+# Seconds a mosque timetable may take before the local calculation is used.
+CONF_SOURCE_DEADLINE: Final = "source_deadline"
+DEFAULT_SOURCE_DEADLINE: Final = 2.0
 CONF_USE_API: Final = "use_api"  # Option to choose API-based prayer times.
 CONF_API_KEY: Final = "api_key"  # API key if required.
 CONF_IQAMAH_OFFSETS: Final = "iqamah_offsets"  # Offsets (in minutes) for Iqamah times.
 DEFAULT_IQAMAH_METHOD: Final = "offset"
 CONF_IQAMAH_METHOD = "iqamah_method"
 DEFAULT_IQAMAH_OFFSETS = {"Fajr": 20, "Dhuhr": 15, "Asr": 15, "Maghrib": 10, "Isha": 15}
+CONF_IQAMAH_TTL: Final = "iqamah_ttl"  # Hours the iqamah API schedule is served.
+DEFAULT_IQAMAH_TTL: Final = 7 * 24
 
 CALC_METHODS = {
     "Jafari": "jafari",
@@ -37,7 +44,26 @@ CALC_METHODS = {
     "Ireland - Hansfield Islamic Cultural Centre (HICC)": "ie-hicc",
 }
 
+# Label of each calculation method, the entries store the method.
+CALC_METHOD_LABELS: Final = {method: label for label, method in CALC_METHODS.items()}
+
 DEFAULT_CALC_METHOD: Final = "ie-icci"
+
+# Columns of the array backed timetables, in order.
+TIMETABLE_PRAYERS: Final = (
+    "Fajr",
+    "Sunrise",
+    "Dhuhr",
+    "Asr",
+    "Sunset",
+    "Maghrib",
+    "Isha",
+    "Imsak",
+    "Midnight",
+)
+# Prayers of the calendar events and the automation triggers, in order.
+EVENT_PRAYERS: Final = ("Fajr", "Dhuhr", "Asr", "Maghrib", "Isha")
 DATA_UPDATED: Final = "muslim_prayer_data_updated"
+SERVICE_GET_TIMETABLE: Final = "get_timetable"
 
 LOGGER = getLogger(__package__)
@@ -4,194 +4,184 @@ Muslim Prayer Companion Coordinator
 
 from __future__ import annotations
 
-import json
-import logging
+import asyncio
+import time
 from datetime import date, datetime, timedelta
+from functools import partial
+from http import HTTPStatus
+from typing import TYPE_CHECKING
 
-import async_timeout
 import homeassistant.util.dt as dt_util
-import requests
-from homeassistant.config_entries import ConfigEntry
+import numpy as np
+from aiohttp import ClientError, ClientSession, ClientTimeout
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
 from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.event import async_call_later, async_track_point_in_time
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from prayer_times_calculator import PrayerTimesCalculator, exceptions
-from requests.exceptions import ConnectionError as ConnError
 
+from .calculation import REFERENCE_METHOD
 from .const import (
     CONF_CALC_METHOD,
+    CONF_HIJRI_ADJUSTMENT,
     CONF_IQAMAH_METHOD,
     CONF_IQAMAH_OFFSETS,
+    CONF_IQAMAH_TTL,
+    CONF_SOURCE_DEADLINE,
     DEFAULT_CALC_METHOD,
+    DEFAULT_HIJRI_ADJUSTMENT,
     DEFAULT_IQAMAH_METHOD,
     DEFAULT_IQAMAH_OFFSETS,
+    DEFAULT_IQAMAH_TTL,
+    DEFAULT_SOURCE_DEADLINE,
     DOMAIN,
+    EVENT_PRAYERS,
     LOGGER,
+    NAME,
+    TIMETABLE_PRAYERS,
+)
+from .dst import apply_dst_correction
+from .engine import async_get_engine
+from .events import PrayerEventIndex
+from .hijri import hijri_date_info
+from .iqamah import IqamahTimetable, parse_iqamah_payload
+from .scheduler import BoundaryScheduler
+from .sources import (
+    IQAMAH_SOURCE,
+    MAGHRIB_CELL,
+    SOURCE_ADAPTERS,
+    DstBehavior,
+    SourceAdapter,
+)
+from .storage import cache_key, grid_location
+from .timetable import (
+    MISSING,
+    DayTimetable,
+    Timetable,
+    minutes_to_datetime,
 )
 
-# --- Utility functions ---
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
 
+    from homeassistant.config_entries import ConfigEntry
 
-def format_time(time_list: list[int], offset: int = 0) -> str:
-    """
-    Convert a list of hour/minutes of a prayer to time in format HH:MM.
+    from .breaker import CircuitBreaker
+    from .stats import SourceStats
 
-    Args:
-        time_list (list): [hour, minute]
-        offset (int): Hour offset correction
+# Deadline of a single HTTP request, in seconds.
+REQUEST_TIMEOUT = ClientTimeout(total=10)
+# Days of prayer times kept ahead, today included.
+PREFETCH_DAYS = 7
+# Days of the calendar before today, the index then covers the coming year.
+CALENDAR_PAST_DAYS = 31
+CALENDAR_DAYS = CALENDAR_PAST_DAYS + 366
 
-    Returns:
-        str: Time in format HH:MM
-    """
-    hour = time_list[0] + offset
-    return f"{str(hour % 24).zfill(2)}:{str(time_list[1]).zfill(2)}"
+# --- Utility functions ---
 
 
-def get_time_list(str_time: str) -> list[int]:
+async def get_json_response_if_modified(
+    session: ClientSession,
+    url: str,
+    validators: dict[str, str | None],
+    stats: SourceStats | None = None,
+) -> tuple[dict | None, dict[str, str | None]]:
     """
-    Convert time string in format HH:MM to time list [hour, minute].
+    Return JSON response from a conditional HTTP request.
 
     Args:
-        str_time (str): Time string in format HH:MM
+        session (ClientSession): Shared aiohttp session
+        url (str): URL to fetch JSON from
+        validators (dict): ETag and Last-Modified of the cached document
+        stats (SourceStats): Counters recording the latency and size, if any
 
     Returns:
-        list: [hour, minute]
-    """
-    return [int(num) for num in str_time.split(":")]
-
+        tuple: JSON response (None if not modified or failed), response
+            validators (None if the request failed)
 
-def get_standard_sunset_midnight(
-    latitude: float, longitude: float, calculation_method: str
-):
     """
-    Return Maghrib time & Midnight time for given latitude, longitude & calculation method.
-
-    Args:
-        latitude (float): Latitude
-        longitude (float): Longitude
-        calculation_method (str): Calculation method
-
-    Returns:
-        tuple: Maghrib time, Midnight time, Full Standard Prayers
-    """
-    midnight = "00:00"
-    maghrib = ""
-    std_prayers = {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    started = time.perf_counter()
     try:
-        calc = PrayerTimesCalculator(
-            latitude=latitude,
-            longitude=longitude,
-            calculation_method="isna",
-            date=str(date.today()),
-        )
-        std_prayers = calc.fetch_prayer_times()
-        midnight = std_prayers.get("Midnight", "00:00")
-        maghrib = std_prayers.get("Maghrib", "")
-    except Exception as e:
-        LOGGER.info(f"Failed to extract midnight/maghrib from ISNA calculation: {e}")
-    return maghrib, midnight, std_prayers
+        async with session.get(url, headers=headers, timeout=REQUEST_TIMEOUT) as resp:
+            if resp.status == HTTPStatus.NOT_MODIFIED:
+                LOGGER.debug(f"{url} : not modified")
+                if stats:
+                    stats.record_request(time.perf_counter() - started)
+            elif resp.status == HTTPStatus.OK:
+                json_resp = await resp.json(content_type=None)
+                if stats:
+                    size = len(await resp.read())
+                    stats.record_request(time.perf_counter() - started, size)
+                return json_resp, {
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                }
+            else:
+                LOGGER.debug(f"{url} : request failed with status code {resp.status}")
+                if stats:
+                    stats.record_failure(time.perf_counter() - started)
+                return None, None
+    except (ClientError, TimeoutError, ValueError) as e:
+        LOGGER.info(f"{url} : request exception raised, got error: {e}")
+        if stats:
+            stats.record_failure(time.perf_counter() - started)
+        return None, None
+    return None, validators
 
 
-def get_json_response(url: str):
+def get_mosque_prayer_times(
+    target_date: date, prayers: Iterable[int], midnight: int
+) -> DayTimetable:
     """
-    Return JSON response from HTTP request.
+    Build the prayer times of a day from the six cells of a mosque timetable.
 
     Args:
-        url (str): URL to fetch JSON from
+        target_date (date): Day of the prayer times
+        prayers (Iterable[int]): DST corrected minutes of the day of Fajr,
+            Sunrise, Dhuhr, Asr, Maghrib and Isha
+        midnight (int): Midnight in minutes of the day
 
     Returns:
-        dict: JSON response
-    """
-    try:
-        resp = requests.get(url=url, timeout=10)
-        if resp.status_code == requests.codes.ok:
-            return resp.json()
-        else:
-            LOGGER.debug(f"{url} : request failed with status code {resp.status_code}")
-    except Exception as e:
-        LOGGER.info(f"{url} : request exception raised, got error: {e}")
-    return None
-
+        DayTimetable: Prayer times information
 
-def get_hour_offset_fix(non_standard_str: str, standard_str: str) -> int:
     """
-    Compare the prayer between the standard and non-standard one, and give the fix offset for the broken week at the start and end of the DST.
+    fajr, sunrise, dhuhr, asr, maghrib, isha = (int(value) for value in prayers)
+    # Same order as const.TIMETABLE_PRAYERS, Sunset and Imsak are Maghrib.
+    return DayTimetable(
+        target_date,
+        (fajr, sunrise, dhuhr, asr, maghrib, maghrib, isha, maghrib, midnight),
+    )
 
-    Args:
-        non_standard_str (str): Non-standard time in format HH:MM
-        standard_str (str): Standard time in format HH:MM
 
-    Returns:
-        int: Hour offset
-    """
-    try:
-        non_standard = datetime.strptime(non_standard_str, "%H:%M")
-        standard = datetime.strptime(standard_str, "%H:%M")
-    except Exception as e:
-        LOGGER.info(f"Failed to parse time expecting HH:MM format: {e}")
-        return 0
-
-    delta = (
-        (non_standard - standard).seconds
-        if non_standard > standard
-        else (standard - non_standard).seconds
-    )
-    if delta > 900:
-        return -1 if non_standard > standard else 1
-    return 0
+# Mosque timetable cell of each prayer of const.TIMETABLE_PRAYERS but Midnight.
+MOSQUE_CELLS = (0, 1, 2, 3, 4, 4, 5, 4)
 
 
-def get_prayers_by_wp_plugin(url: str, name: str, standard_maghrib: str, midnight: str):
+def overlay_rows(timetable: Timetable, start: date, rows: np.ndarray) -> None:
     """
-    Get the prayers from a WordPress site with the Daily Prayer Time plugin.
+    Copy the known cells of the days from start over the same days of a timetable.
 
     Args:
-        url (str): URL to fetch prayers from
-        name (str): Name of the calculation method
-        standard_maghrib (str): Standard Maghrib time
-        midnight (str): Midnight time
+        timetable (Timetable): Timetable updated in place
+        start (date): Day of the first row
+        rows (np.ndarray): Minutes of the leading prayers of each day, MISSING
+            cells keep the minutes of the timetable
 
-    Returns:
-        dict: Prayer times information
     """
-    json_resp = get_json_response(url)
-    if json_resp:
-        try:
-            wp_prayers = json_resp[0]
-            hr_offset = get_hour_offset_fix(
-                wp_prayers["maghrib_begins"][0:5], standard_maghrib
-            )
-            prayer_times_info = {
-                "Fajr": format_time(
-                    get_time_list(wp_prayers["fajr_begins"][0:5]), hr_offset
-                ),
-                "Sunrise": format_time(
-                    get_time_list(wp_prayers["sunrise"][0:5]), hr_offset
-                ),
-                "Dhuhr": format_time(
-                    get_time_list(wp_prayers["zuhr_begins"][0:5]), hr_offset
-                ),
-                "Asr": format_time(
-                    get_time_list(wp_prayers["asr_mithl_1"][0:5]), hr_offset
-                ),
-                "Sunset": format_time(
-                    get_time_list(wp_prayers["maghrib_begins"][0:5]), hr_offset
-                ),
-                "Maghrib": format_time(
-                    get_time_list(wp_prayers["maghrib_begins"][0:5]), hr_offset
-                ),
-                "Isha": format_time(
-                    get_time_list(wp_prayers["isha_begins"][0:5]), hr_offset
-                ),
-                "Imsak": format_time(
-                    get_time_list(wp_prayers["maghrib_begins"][0:5]), hr_offset
-                ),
-                "Midnight": midnight,
-            }
-            return prayer_times_info
-        except Exception as e:
-            LOGGER.info(f"Failed to retrieve prayer from {name}, JSON parse error: {e}")
-    return None
+    offset = (start - timetable.start).days
+    first, last = max(offset, 0), min(offset + len(rows), len(timetable))
+    if first >= last:
+        return
+    rows = rows[first - offset : last - offset]
+    np.copyto(
+        timetable.minutes[first:last, : rows.shape[1]], rows, where=rows != MISSING
+    )
 
 
 # --- Coordinator Class ---
@@ -205,121 +195,518 @@ class MuslimPrayerCompanionDataUpdateCoordinator(DataUpdateCoordinator[dict[str,
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize the coordinator."""
         self.event_unsub: CALLBACK_TYPE | None = None
+        # Timetables, cache and breakers shared with the other config entries.
+        self.engine = async_get_engine(hass)
+        self.cache = self.engine.cache
+        self._coalescer = self.engine.coalescer
+        self._iqamah: IqamahTimetable | None = None
+        # Rolling window of prayer times starting today.
+        self._window: Timetable | None = None
+        # Calendar events of the day the index was built, reset with the window.
+        self._event_index: tuple[date, PrayerEventIndex] | None = None
+        self._unsub_refill: CALLBACK_TYPE | None = None
+        self._refill_at: datetime | None = None
+        self._scheduler = BoundaryScheduler(hass, self._async_boundary_reached)
+        # Keys whose value changed with the last published data.
+        self.changed_keys: set[str] = set()
+        self._published: dict[str, any] = {}
+        # Days served from the ISNA calculation because the source had none.
+        self.fallback_count = 0
+        # No polling: prayer boundaries are tracked by the scheduler, the day
+        # rolls over within the window and the window is refilled once a day.
         super().__init__(
             hass=hass,
             logger=LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(minutes=60),
+            update_interval=None,
         )
 
     @property
     def calc_method(self) -> str:
         """Return the calculation method."""
-        return self.config_entry.options.get(CONF_CALC_METHOD, DEFAULT_CALC_METHOD)
+        return self.config_entry.options.get(
+            CONF_CALC_METHOD,
+            self.config_entry.data.get(CONF_CALC_METHOD, DEFAULT_CALC_METHOD),
+        )
 
     @property
     def iqamah_method(self) -> str:
         """Return the iqamah method."""
         return self.config_entry.options.get(CONF_IQAMAH_METHOD, DEFAULT_IQAMAH_METHOD)
 
-    def get_hijri_date(self) -> dict[str, str]:
-        """Fetch Hijri date."""
-        calc = PrayerTimesCalculator(
-            latitude=self.hass.config.latitude,
-            longitude=self.hass.config.longitude,
-            calculation_method="isna",
-            date=str(date.today()),
+    @property
+    def iqamah_offsets(self) -> dict[str, int] | None:
+        """Return the iqamah offsets in minutes, None if they come from the API."""
+        if self.iqamah_method != "offset":
+            return None
+        return self.config_entry.options.get(
+            CONF_IQAMAH_OFFSETS, DEFAULT_IQAMAH_OFFSETS
+        )
+
+    @property
+    def hijri_adjustment(self) -> int:
+        """Return the Hijri date adjustment in days."""
+        return self.config_entry.options.get(
+            CONF_HIJRI_ADJUSTMENT,
+            self.config_entry.data.get(CONF_HIJRI_ADJUSTMENT, DEFAULT_HIJRI_ADJUSTMENT),
+        )
+
+    @property
+    def source_deadline(self) -> float:
+        """Return the seconds a mosque timetable may take before it is raced."""
+        return self.config_entry.options.get(
+            CONF_SOURCE_DEADLINE,
+            self.config_entry.data.get(CONF_SOURCE_DEADLINE, DEFAULT_SOURCE_DEADLINE),
+        )
+
+    @property
+    def iqamah_ttl(self) -> timedelta:
+        """Return how long the iqamah API schedule is served before revalidation."""
+        return timedelta(
+            hours=self.config_entry.options.get(CONF_IQAMAH_TTL, DEFAULT_IQAMAH_TTL)
+        )
+
+    @property
+    def iqamah_timetable(self) -> IqamahTimetable:
+        """Return the per day iqamah API cache, restored from the timetable cache."""
+        if self._iqamah is None:
+            self._iqamah = IqamahTimetable()
+            self._iqamah.restore(self.cache.get_source(self.iqamah_source))
+        return self._iqamah
+
+    @property
+    def latitude(self) -> float:
+        """Return the latitude of the entry, Home Assistant's by default."""
+        return self.config_entry.options.get(
+            CONF_LATITUDE,
+            self.config_entry.data.get(CONF_LATITUDE, self.hass.config.latitude),
+        )
+
+    @property
+    def longitude(self) -> float:
+        """Return the longitude of the entry, Home Assistant's by default."""
+        return self.config_entry.options.get(
+            CONF_LONGITUDE,
+            self.config_entry.data.get(CONF_LONGITUDE, self.hass.config.longitude),
+        )
+
+    @property
+    def location(self) -> tuple[float, float]:
+        """Return the grid cell of the entry, shared by nearby entries."""
+        return grid_location(self.latitude, self.longitude)
+
+    @property
+    def session(self) -> ClientSession:
+        """Return the shared aiohttp session of Home Assistant."""
+        return async_get_clientsession(self.hass)
+
+    @property
+    def cache_key(self) -> str:
+        """Return the timetable cache key of the configured location and method."""
+        return cache_key(*self.location, self.calc_method)
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device of the config entry, shared by its entities."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.config_entry.entry_id)},
+            name=self.config_entry.title or NAME,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def iqamah_source(self) -> str:
+        """Return the name of the iqamah API source of the entry."""
+        return f"{IQAMAH_SOURCE}_{self.config_entry.entry_id}"
+
+    def get_calculated_timetable(self, method: str, target_date: date) -> Timetable:
+        """Return the locally computed timetable of method covering target_date."""
+        return self.engine.get_calculated_timetable(self.location, method, target_date)
+
+    def get_cached_timetable(
+        self, start: date, days: int, method: str | None = None
+    ) -> Timetable:
+        """
+        Return the prayer times of a range of days without fetching anything.
+
+        Days come from the window, then the indexed mosque timetable, then the
+        local calculation, ISNA's for a mosque without the day.
+
+        Args:
+            start (date): First day of the range
+            days (int): Number of days of the range
+            method (str): Calculation method, the configured one by default
+
+        Returns:
+            Timetable: Prayer times of every day of the range
+
+        """
+        calc_method = method or self.calc_method
+        adapter = SOURCE_ADAPTERS.get(calc_method)
+        method = REFERENCE_METHOD if adapter else calc_method
+        minutes = np.empty((days, len(TIMETABLE_PRAYERS)), dtype=np.int16)
+        offset = 0
+        while offset < days:
+            day = start + timedelta(days=offset)
+            table = self.get_calculated_timetable(method, day)
+            first = table.index(day)
+            count = min(days - offset, len(table) - first)
+            minutes[offset : offset + count] = table.minutes[first : first + count]
+            offset += count
+        timetable = Timetable(start, minutes)
+        if adapter is not None:
+            periods = self.engine.get_source_timetable(adapter).periods
+            for period in periods.values():
+                rows = period.minutes[:, MOSQUE_CELLS]
+                # Like a lookup of the day, a partial row is no row at all.
+                rows[(rows == MISSING).any(axis=1)] = MISSING
+                overlay_rows(timetable, period.start, rows)
+        if self._window is not None and calc_method == self.calc_method:
+            overlay_rows(timetable, self._window.start, self._window.minutes)
+        return timetable
+
+    async def async_get_timetable(
+        self, start: date, days: int, method: str | None = None
+    ) -> Timetable:
+        """
+        Return the prayer times of a range of days.
+
+        The missing periods of a mosque timetable are downloaded with one
+        request each.
+
+        Args:
+            start (date): First day of the range
+            days (int): Number of days of the range
+            method (str): Calculation method, the configured one by default
+
+        Returns:
+            Timetable: Prayer times of every day of the range
+
+        """
+        adapter = SOURCE_ADAPTERS.get(method or self.calc_method)
+        if adapter is not None:
+            table = self.engine.get_source_timetable(adapter)
+            first, last = adapter.supported_range(dt_util.now().date())
+            last = min(last, start + timedelta(days=days - 1))
+            period = adapter.granularity.period_start(max(start, first))
+            refreshes = []
+            while period <= last:
+                if table.needs_refresh(period, adapter.ttl) and self._source_available(
+                    adapter.name
+                ):
+                    refreshes.append(
+                        self._coalescer.async_run(
+                            (adapter.name, period),
+                            partial(self._refresh_source, adapter, period),
+                        )
+                    )
+                period += timedelta(days=adapter.granularity.period_days(period))
+            await asyncio.gather(*refreshes)
+        return self.get_cached_timetable(start, days, method)
+
+    def get_iqamah_minutes(self, timetable: Timetable) -> np.ndarray | None:
+        """Return the cached API iqamah times of the days of a timetable, if used."""
+        if self.iqamah_method == "offset":
+            return None
+        return self.iqamah_timetable.get_range(timetable.dates())
+
+    @property
+    def event_index(self) -> PrayerEventIndex:
+        """Return the calendar events from a month ago to a year ahead."""
+        today = dt_util.now().date()
+        if self._event_index is None or self._event_index[0] != today:
+            timetable = self.get_cached_timetable(
+                today - timedelta(days=CALENDAR_PAST_DAYS), CALENDAR_DAYS
+            )
+            index = PrayerEventIndex.from_timetable(
+                timetable,
+                dt_util.DEFAULT_TIME_ZONE,
+                self.iqamah_offsets,
+                self.get_iqamah_minutes(timetable),
+            )
+            self._event_index = (today, index)
+        return self._event_index[1]
+
+    @callback
+    def _async_timetable_changed(self) -> None:
+        """Rebuild the calendar events and reschedule the triggers on demand."""
+        self._event_index = None
+        now = dt_util.utcnow()
+        for trigger in self.engine.triggers:
+            if trigger.follows(self):
+                trigger.async_schedule(self, now)
+
+    def next_prayer_time(
+        self, prayer: str, offset: timedelta, after: datetime, *, iqamah: bool
+    ) -> datetime | None:
+        """
+        Return the first time of a prayer or its iqamah after a moment.
+
+        The time is shifted by offset before it is compared with the moment.
+
+        Args:
+            prayer (str): Name of the prayer
+            offset (timedelta): Shift of the time, negative before it
+            after (datetime): Moment the shifted time must follow
+            iqamah (bool): Whether to use the iqamah time of the prayer
+
+        Returns:
+            datetime: Shifted time in UTC, None if it is not known yet
+
+        """
+        when = self.event_index.next_time(prayer, after - offset, iqamah=iqamah)
+        return when + offset if when else None
+
+    @callback
+    def async_schedule_at(
+        self, when: datetime, action: Callable[[datetime], None]
+    ) -> CALLBACK_TYPE:
+        """Run an action at a given time on the boundary timer of the entry."""
+        return self._scheduler.async_schedule(when, action)
+
+    @property
+    def timetable_source(self) -> str | None:
+        """Return the name of the mosque timetable source, if any."""
+        adapter = SOURCE_ADAPTERS.get(self.calc_method)
+        return adapter.name if adapter else None
+
+    @property
+    def source_names(self) -> list[str]:
+        """Return the names of the sources the entry depends on."""
+        names = [self.iqamah_source]
+        if source := self.timetable_source:
+            names.append(source)
+        return names
+
+    @property
+    def stale(self) -> bool:
+        """Return whether a source failed and cached or fallback data is served."""
+        return any(
+            self.engine.breakers[name].stale
+            for name in self.source_names
+            if name in self.engine.breakers
         )
-        hijri_data = calc.fetch_prayer_times().get("date")
-        hijri_date = hijri_data["hijri"]["date"]  # DD-MM-YYYY
-        hijri_day = hijri_data["hijri"]["day"]
-        hijri_month_num = hijri_data["hijri"]["month"]["number"]
-        hijri_month_readable = hijri_data["hijri"]["month"]["en"]
-        hijri_year = hijri_data["hijri"]["year"]
-        hijri_day_month_readable = f"{hijri_day}-{hijri_month_readable}"
-        hijri_date_readable = f"{hijri_day}-{hijri_month_readable}-{hijri_year}"
 
+    @property
+    def scheduled_timers(self) -> int:
+        """Return the number of timers the entry has armed."""
+        return sum(
+            (
+                self.event_unsub is not None,
+                self._unsub_refill is not None,
+                self._scheduler.next_boundary is not None,
+            )
+        )
+
+    def get_diagnostics(self) -> dict[str, any]:
+        """Return the performance counters of the entry and its sources."""
+        sources = {}
+        for name in self.source_names:
+            breaker = self.engine.breakers.get(name)
+            sources[name] = {
+                **self.engine.source_stats(name).as_dict(),
+                "last_success": breaker and breaker.last_success,
+                "stale": bool(breaker and breaker.stale),
+            }
+        coalescer = self._coalescer
+        lookups = coalescer.hits + coalescer.misses
         return {
-            "hijri_date": hijri_date,
-            "hijri_day": hijri_day,
-            "hijri_month_num": hijri_month_num,
-            "hijri_month_readable": hijri_month_readable,
-            "hijri_year": hijri_year,
-            "hijri_date_readable": hijri_date_readable,
-            "hijri_day_month_readable": hijri_day_month_readable,
+            "timetable_source": self.timetable_source,
+            "sources": sources,
+            "requests": {
+                "coalesced_hits": coalescer.hits,
+                "coalesced_misses": coalescer.misses,
+                "hit_ratio": coalescer.hits / lookups if lookups else None,
+            },
+            "fallback_count": self.fallback_count,
+            "scheduled_timers": self.scheduled_timers,
+            "scheduled_triggers": self._scheduler.jobs,
+            "window_days": len(self._window) if self._window is not None else 0,
+            "last_bulk_refresh": (
+                self.engine.last_refresh._asdict() if self.engine.last_refresh else None
+            ),
         }
 
-    def _get_prayer_times_standard(self, target_date: date) -> dict[str, str]:
-        """Fetch prayer times for standard calculation methods on target_date."""
-        calc = PrayerTimesCalculator(
-            latitude=self.hass.config.latitude,
-            longitude=self.hass.config.longitude,
-            calculation_method="isna",
-            date=str(target_date),
+    def _breaker(self, name: str) -> CircuitBreaker:
+        """Return the shared circuit breaker of a source."""
+        return self.engine.breaker(name)
+
+    def _source_available(self, name: str) -> bool:
+        """Return whether a source may be queried, its backoff having passed."""
+        return self._breaker(name).allow_request()
+
+    def _source_succeeded(self, name: str) -> None:
+        """Record a successful request to a source."""
+        self._breaker(name).record_success()
+
+    def _source_failed(self, name: str) -> None:
+        """Record a failed request and revalidate once the backoff has passed."""
+        delay = self._breaker(name).record_failure()
+        LOGGER.warning(
+            "%s is unavailable, serving the last known prayer times, retrying in %s",
+            name,
+            delay,
+        )
+        # One second late, so the breaker lets the request through.
+        self._async_schedule_refill(delay.total_seconds() + 1)
+
+    def get_hijri_date(self) -> dict[str, str]:
+        """Compute the Hijri date (Umm al-Qura calendar) of today."""
+        return hijri_date_info(dt_util.now().date(), self.hijri_adjustment)
+
+    def _get_reference_times(self, target_date: date) -> DayTimetable:
+        """Return the ISNA prayer times used as reference and fallback."""
+        return self.get_calculated_timetable(REFERENCE_METHOD, target_date).day(
+            target_date
         )
-        return calc.fetch_prayer_times()
 
-    def _get_prayer_times_ie_icci(self, target_date: date) -> dict[str, str]:
-        """Fetch prayer times for 'ie-icci' method on target_date."""
-        st_maghrib, midnight, isna_prayers = get_standard_sunset_midnight(
-            self.hass.config.latitude, self.hass.config.longitude, "isna"
+    def _get_prayer_times_standard(self, target_date: date) -> DayTimetable:
+        """Compute prayer times for standard calculation methods on target_date."""
+        return self.get_calculated_timetable(self.calc_method, target_date).day(
+            target_date
         )
-        url = "https://islamireland.ie/api/timetable/"
-        json_resp = get_json_response(url)
-        if json_resp:
-            try:
-                current_month = target_date.strftime("%-m")
-                current_day = target_date.strftime("%-d")
-                prayers = json_resp["timetable"][current_month][current_day]
-                icci_maghrib = format_time(prayers[4], 0)
-                hr_offset = get_hour_offset_fix(icci_maghrib, st_maghrib)
-                prayer_times_info = {
-                    "Fajr": format_time(prayers[0], hr_offset),
-                    "Sunrise": format_time(prayers[1], hr_offset),
-                    "Dhuhr": format_time(prayers[2], hr_offset),
-                    "Asr": format_time(prayers[3], hr_offset),
-                    "Sunset": format_time(prayers[4], hr_offset),
-                    "Maghrib": format_time(prayers[4], hr_offset),
-                    "Isha": format_time(prayers[5], hr_offset),
-                    "Imsak": format_time(prayers[4], hr_offset),
-                    "Midnight": midnight,
-                }
-                return prayer_times_info
-            except Exception as e:
-                LOGGER.info(f"ICCI API parse error: {e}")
-                return isna_prayers
-        else:
-            LOGGER.info("ICCI API JSON response is None.")
-            return isna_prayers
 
-    def _get_prayer_times_wp_plugin(
-        self, calc_method: str, target_date: date
-    ) -> dict[str, str]:
-        """Fetch prayer times for WordPress plugin calculation methods on target_date."""
-        st_maghrib, midnight, isna_prayers = get_standard_sunset_midnight(
-            self.hass.config.latitude, self.hass.config.longitude, "isna"
+    async def _get_source_prayer_times(
+        self, adapter: SourceAdapter, target_date: date
+    ) -> DayTimetable | None:
+        """Return the prayer times of target_date from a timetable source."""
+        table = self.engine.get_source_timetable(adapter)
+        first, last = adapter.supported_range(dt_util.now().date())
+        stats = self.engine.source_stats(adapter.name)
+        needs_refresh = first <= target_date <= last and table.needs_refresh(
+            target_date, adapter.ttl
         )
-        url = f"https://{calc_method.split('-')[1]}.ie/wp-json/dpt/v1/prayertime?filter=today"
-        prayer_times_info = get_prayers_by_wp_plugin(
-            url, calc_method, st_maghrib, midnight
+        if needs_refresh:
+            stats.cache_misses += 1
+        else:
+            stats.cache_hits += 1
+        if needs_refresh and self._source_available(adapter.name):
+            # One request per period, shared by all the days it holds.
+            start = adapter.granularity.period_start(target_date)
+            await self._coalescer.async_run(
+                (adapter.name, start), partial(self._refresh_source, adapter, start)
+            )
+        prayers = table.get_day(target_date)
+        if prayers is None:
+            LOGGER.info(
+                "%s timetable has no prayer times for %s.", adapter.name, target_date
+            )
+            return None
+        return get_mosque_prayer_times(
+            target_date, prayers, self._get_reference_times(target_date)["Midnight"]
         )
-        return prayer_times_info if prayer_times_info else isna_prayers
 
-    def get_new_prayer_times(self) -> dict[str, str]:
-        """Fetch prayer times for the target date using the configured calculation method.
+    async def _refresh_source(self, adapter: SourceAdapter, start: date) -> None:
+        """Download a period of a timetable source if it is missing or has changed."""
+        table = self.engine.get_source_timetable(adapter)
+        try:
+            minutes, validators = await adapter.async_fetch(
+                self.engine.limiter.limit(
+                    partial(
+                        get_json_response_if_modified,
+                        self.session,
+                        stats=self.engine.source_stats(adapter.name),
+                    )
+                ),
+                start,
+                table.validators(start),
+            )
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            LOGGER.info(f"{adapter.name} timetable parse error: {e}")
+            minutes, validators = None, None
+        if validators is None or (minutes is None and table.period(start) is None):
+            self._source_failed(adapter.name)
+            return
+        if minutes is not None and adapter.dst is DstBehavior.BROKEN_WEEK:
+            minutes = apply_dst_correction(
+                start, minutes, MAGHRIB_CELL, dt_util.DEFAULT_TIME_ZONE
+            )
+        table.update(start, minutes, validators)
+        self._async_timetable_changed()
+        self._source_succeeded(adapter.name)
+        self.cache.async_set_source(adapter.name, table.as_dict())
+
+    async def get_new_prayer_times(
+        self, target_date: date | None = None
+    ) -> DayTimetable:
+        """
+        Fetch prayer times for the target date with the configured calculation method.
 
-        To support showing the next occurrence if a prayer time has passed,
-        we compute for today and adjust by adding one day when needed.
+        Prayer times fetched from a source are cached. When the source has
+        nothing for the date, the cached times are used, then the ISNA ones.
+        A mosque timetable races against these: if it is not there within the
+        source deadline, they are returned and the timetable is swapped in
+        when it arrives.
         """
-        target_date = date.today()
+        target_date = target_date or dt_util.now().date()
         calc_method = self.calc_method
-        if calc_method == "ie-icci":
-            prayer_times = self._get_prayer_times_ie_icci(target_date)
-        elif calc_method in ["ie-mcnd", "ie-hicc"]:
-            prayer_times = self._get_prayer_times_wp_plugin(calc_method, target_date)
-        else:
-            prayer_times = self._get_prayer_times_standard(target_date)
-        return prayer_times
+        key = (*self.location, calc_method, target_date)
+        fetch = asyncio.ensure_future(
+            self._coalescer.async_run(
+                key, partial(self._fetch_prayer_times, calc_method, target_date)
+            )
+        )
+        if calc_method in SOURCE_ADAPTERS and not fetch.done():
+            done, _ = await asyncio.wait({fetch}, timeout=self.source_deadline)
+            if not done:
+                LOGGER.debug(
+                    "%s missed the deadline for %s, using the calculation",
+                    calc_method,
+                    target_date,
+                )
+                fetch.add_done_callback(
+                    partial(self._async_late_prayer_times, target_date)
+                )
+                return self._get_fallback_times(target_date)
+        prayer_times = await fetch
+        if prayer_times:
+            self.cache.async_set_day(self.cache_key, target_date, prayer_times.minutes)
+            return prayer_times
+        return self._get_fallback_times(target_date)
+
+    def _get_fallback_times(self, target_date: date) -> DayTimetable:
+        """Return the cached prayer times of a day, or the ISNA ones."""
+        if (row := self.cache.get_day(self.cache_key, target_date)) is not None:
+            return DayTimetable(target_date, row)
+        self.fallback_count += 1
+        return self._get_reference_times(target_date)
+
+    @callback
+    def _async_late_prayer_times(
+        self, target_date: date, fetch: asyncio.Future
+    ) -> None:
+        """Swap in mosque prayer times that arrived after the source deadline."""
+        if fetch.cancelled() or fetch.exception() is not None:
+            return
+        prayer_times = fetch.result()
+        if not prayer_times:
+            return
+        self.cache.async_set_day(self.cache_key, target_date, prayer_times.minutes)
+        if self._window is None or target_date not in self._window:
+            # Picked up from the cache by the next refresh.
+            return
+        self._window.minutes[self._window.index(target_date)] = prayer_times.minutes
+        self._async_timetable_changed()
+        if target_date <= dt_util.now().date() + timedelta(days=1):
+            self.async_set_updated_data(self._build_data())
+
+    async def _async_fill_window(self, start: date) -> None:
+        """Fetch the prayer times of every day of the window starting at start."""
+        days = [start + timedelta(days=offset) for offset in range(PREFETCH_DAYS)]
+        day_times = await asyncio.gather(
+            *(self.get_new_prayer_times(day) for day in days)
+        )
+        self._window = Timetable(start, [times.minutes for times in day_times])
+        self._async_timetable_changed()
+
+    async def _fetch_prayer_times(
+        self, calc_method: str, target_date: date
+    ) -> DayTimetable | None:
+        """Fetch prayer times of target_date from the source of calc_method."""
+        adapter = SOURCE_ADAPTERS.get(calc_method)
+        if adapter is None:
+            return self._get_prayer_times_standard(target_date)
+        return await self._get_source_prayer_times(adapter, target_date)
 
     def _get_iqamah_times_offset(
         self, prayer_times_dt: dict[str, datetime]
@@ -340,92 +727,196 @@ class MuslimPrayerCompanionDataUpdateCoordinator(DataUpdateCoordinator[dict[str,
                 iqamah[f"iqamah_{prayer}"] = dt_util.as_utc(local_iqamah)
         return iqamah
 
-    def _get_iqamah_times_api(self) -> dict[str, datetime]:
-        """Fetch iqamah times from an external API (placeholder implementation)."""
-        # For example, use a custom API endpoint if provided.
+    async def _fetch_iqamah_api(self) -> None:
+        """Revalidate the iqamah API schedule once its TTL has passed."""
         custom_api = self.config_entry.options.get("custom_iqamah_api")
+        if not custom_api:
+            return
+        table = self.iqamah_timetable
+        stats = self.engine.source_stats(self.iqamah_source)
+        today = dt_util.now().date()
+        if not table.needs_refresh(today, self.iqamah_ttl):
+            stats.cache_hits += 1
+            return
+        stats.cache_misses += 1
+        if not self._source_available(self.iqamah_source):
+            return
+        json_resp, validators = await self.engine.limiter.limit(
+            partial(get_json_response_if_modified, self.session, stats=stats)
+        )(custom_api, table.validators)
+        days = None
+        if json_resp is not None:
+            try:
+                days = parse_iqamah_payload(json_resp, today)
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                LOGGER.error(f"Error parsing IQamah API response: {e}")
+                validators = None
+        if validators is None:
+            # Keep the last good schedule.
+            self._source_failed(self.iqamah_source)
+            return
+        table.update(days, validators)
+        self.cache.async_set_source(self.iqamah_source, table.as_dict())
+        if days is not None:
+            self._async_timetable_changed()
+        self._source_succeeded(self.iqamah_source)
+
+    def _get_iqamah_times_api(self) -> dict[str, datetime]:
+        """Return the next iqamah times from the iqamah API schedule."""
+        table = self.iqamah_timetable
+        today = dt_util.now()
+        time_zone = dt_util.DEFAULT_TIME_ZONE
         iqamah = {}
-        if custom_api:
-            json_resp = get_json_response(custom_api)
-            if json_resp:
-                try:
-                    # Assume API returns times in HH:MM for each prayer.
-                    for prayer in ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]:
-                        time_str = json_resp.get(prayer)
-                        if time_str:
-                            # Convert time_str to datetime (adjusting date if needed)
-                            local_dt = dt_util.parse_datetime(
-                                f"{date.today()} {time_str}"
-                            )
-                            if local_dt < dt_util.now():
-                                local_dt = dt_util.parse_datetime(
-                                    f"{date.today() + timedelta(days=1)} {time_str}"
-                                )
-                            iqamah[f"iqamah_{prayer}"] = dt_util.as_utc(local_dt)
-                except Exception as e:
-                    LOGGER.error(f"Error parsing IQamah API response: {e}")
+        for day in (today.date(), today.date() + timedelta(days=1)):
+            row = table.get_day(day)
+            if row is None:
+                continue
+            for prayer, minutes in zip(EVENT_PRAYERS, row, strict=True):
+                key = f"iqamah_{prayer}"
+                if minutes == MISSING or key in iqamah:
+                    continue
+                local_dt = minutes_to_datetime(day, minutes, time_zone)
+                if local_dt >= today:
+                    iqamah[key] = dt_util.as_utc(local_dt)
         return iqamah
 
     @callback
-    def async_schedule_future_update(self, midnight_dt: datetime) -> None:
+    def async_schedule_rollover(self) -> None:
         """
-        Schedule the next update after midnight.
+        Schedule the day rollover at the next local midnight.
         """
-        LOGGER.debug("Scheduling next update for Muslim Prayer Companion")
-        now = dt_util.utcnow()
-        next_update_at = (
-            midnight_dt + timedelta(days=1, minutes=1)
-            if now > midnight_dt
-            else dt_util.start_of_local_day(now + timedelta(days=1))
-        )
-        LOGGER.debug(f"Next update scheduled for: {next_update_at}")
+        next_day = dt_util.start_of_local_day(dt_util.now() + timedelta(days=1))
+        LOGGER.debug(f"Next day rollover scheduled for: {next_day}")
+        if self.event_unsub:
+            self.event_unsub()
         self.event_unsub = async_track_point_in_time(
-            self.hass, self.async_request_update, next_update_at
+            self.hass, self._async_rollover, next_day
         )
 
-    async def async_request_update(self, *_) -> None:
+    @callback
+    def _async_rollover(self, _now: datetime) -> None:
+        """Advance to the next day of the window and refill it later."""
+        self.event_unsub = None
+        if self._window is None or dt_util.now().date() not in self._window:
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+        self.async_set_updated_data(self._build_data())
+        # Refill the window in a quiet period, along with the other entries.
+        self.engine.async_schedule_refill(self)
+
+    @callback
+    def _async_schedule_refill(self, delay: float) -> None:
+        """Refill the window in the background after delay seconds, or earlier."""
+        refill_at = dt_util.utcnow() + timedelta(seconds=delay)
+        if self._unsub_refill:
+            if self._refill_at <= refill_at:
+                return
+            self._unsub_refill()
+        self._refill_at = refill_at
+        self._unsub_refill = async_call_later(self.hass, delay, self._async_refill)
+
+    async def _async_refill(self, *_: object) -> None:
+        """Refill the prayer times window in the background."""
+        self._unsub_refill = None
+        await self.async_request_refresh()
+
+    async def async_request_update(self, *_: object) -> None:
         """Request an update from the coordinator."""
         await self.async_request_refresh()
 
+    @callback
+    def _async_boundary_reached(self, now: datetime) -> None:
+        """Recompute the derived state when a prayer or iqamah time is reached."""
+        if self._window is None:
+            return
+        LOGGER.debug("Prayer boundary reached at %s", now)
+        self.async_set_updated_data(self._build_data())
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Publish the set of changed keys, then notify the listeners."""
+        data = self.data or {}
+        self.changed_keys = {
+            key
+            for key in data.keys() | self._published.keys()
+            if data.get(key) != self._published.get(key)
+        }
+        self._published = dict(data)
+        super().async_update_listeners()
+
+    async def async_shutdown(self) -> None:
+        """Cancel any scheduled update and the boundary timer."""
+        await super().async_shutdown()
+        self._scheduler.async_cancel()
+        self.engine.async_cancel_refill(self)
+        if self._unsub_refill:
+            self._unsub_refill()
+            self._unsub_refill = None
+
+    async def async_restore(self) -> bool:
+        """
+        Publish the prayer times window from the timetable cache.
+
+        No network call is made.
+
+        Returns:
+            bool: False if the cache has no prayer times for today
+
+        """
+        await self.cache.async_load()
+        today = dt_util.now().date()
+        rows = []
+        for offset in range(PREFETCH_DAYS):
+            row = self.cache.get_day(self.cache_key, today + timedelta(days=offset))
+            if row is None:
+                break
+            rows.append(row)
+        if not rows:
+            return False
+        LOGGER.debug("Restored %s days of prayer times from the cache", len(rows))
+        self._window = Timetable(today, rows)
+        self._async_timetable_changed()
+        self.async_set_updated_data(self._build_data())
+        return True
+
     async def _async_update_data(self) -> dict[str, any]:
         """Update sensors with new prayer, iqamah and hijri date data."""
-        now = dt_util.as_local(dt_util.now())
-        today = date.today()
+        fetches = [self._async_fill_window(dt_util.now().date())]
+        if self.iqamah_method != "offset":
+            fetches.append(self._fetch_iqamah_api())
         try:
-            # Fetch prayer times (for today; will adjust if passed)
-            raw_prayer_times = await self.hass.async_add_executor_job(
-                self.get_new_prayer_times
-            )
-            hijri_date = await self.hass.async_add_executor_job(self.get_hijri_date)
-        except (exceptions.InvalidResponseError, ConnError) as err:
-            async_call_later(self.hass, 60, self.async_request_update)
-            raise UpdateFailed from err
-
+            # Fetch the prayer times of the whole window and the iqamah times
+            # at the same time.
+            await asyncio.gather(*fetches)
+        except (ClientError, TimeoutError) as err:
+            # Sources retry on their own backoff, keep serving the window.
+            if self._window is None or dt_util.now().date() not in self._window:
+                raise UpdateFailed from err
+            LOGGER.warning(f"Serving the cached prayer times, refresh failed: {err}")
+        return self._build_data()
+
+    def _build_data(self) -> dict[str, any]:
+        """Build the sensor data from the prayer times window."""
+        now = dt_util.now()
+        today = now.date()
+        tomorrow = today + timedelta(days=1)
+        today_row = self._window.row(today)
+        tomorrow_row = self._window.row(tomorrow) if tomorrow in self._window else None
+        time_zone = dt_util.DEFAULT_TIME_ZONE
         prayer_times_dt: dict[str, datetime] = {}
-        # For each prayer time string, determine if the time has already passed; if so, use tomorrow’s date.
-        for prayer, time_str in raw_prayer_times.items():
-            try:
-                if isinstance(time_str, str):
-                    candidate = datetime.strptime(time_str, "%H:%M")
-                    candidate = candidate.replace(
-                        year=today.year, month=today.month, day=today.day
-                    )
-                    candidate = dt_util.as_local(candidate)  # Convert to local time
-
-                    if candidate < now:
-                        candidate = candidate + timedelta(
-                            days=1
-                        )  # Move to next day if needed
-
-                    prayer_times_dt[prayer] = dt_util.as_utc(
-                        candidate
-                    )  # Convert to UTC-aware
-                else:
-                    LOGGER.error(
-                        f"Error parsing prayer time for {prayer}: time_str is not a string"
-                    )
-            except Exception as e:
-                LOGGER.error(f"Error parsing prayer time for {prayer}: {e}")
+        # Build the datetime of each prayer from its minute of the day; if the
+        # time has already passed, use tomorrow's time and date.
+        for column, prayer in enumerate(TIMETABLE_PRAYERS):
+            minutes = int(today_row[column])
+            if minutes == MISSING:
+                continue
+            candidate = minutes_to_datetime(today, minutes, time_zone)
+            if candidate <= now:
+                # Move to next day if needed
+                if tomorrow_row is not None and tomorrow_row[column] != MISSING:
+                    minutes = int(tomorrow_row[column])
+                candidate = minutes_to_datetime(tomorrow, minutes, time_zone)
+            prayer_times_dt[prayer] = dt_util.as_utc(candidate)  # Convert to UTC-aware
 
         # Compute IQamah times based on the selected method.
         if self.iqamah_method == "offset":
@@ -446,25 +937,17 @@ class MuslimPrayerCompanionDataUpdateCoordinator(DataUpdateCoordinator[dict[str,
         data: dict[str, any] = {}
         data.update(prayer_times_dt)
         data.update(iqamah_times)
-        data.update(hijri_date)
+        data.update(self.get_hijri_date())
         if next_prayer_time:
             data["next_prayer"] = next_prayer_time
             data["next_prayer_name"] = next_prayer_name
+        data["stale"] = self.stale
 
-        # Schedule the next update at midnight.
-        if "Midnight" in raw_prayer_times:
-            midnight_candidate = dt_util.parse_datetime(
-                f"{today} {raw_prayer_times['Midnight']}"
-            )
-            if midnight_candidate and midnight_candidate.tzinfo is None:
-                midnight_candidate = dt_util.as_local(midnight_candidate)
-            if midnight_candidate < now:
-                midnight_candidate = dt_util.parse_datetime(
-                    f"{today + timedelta(days=1)} {raw_prayer_times['Midnight']}"
-                )
-                if midnight_candidate and midnight_candidate.tzinfo is None:
-                    midnight_candidate = dt_util.as_local(midnight_candidate)
-            self.async_schedule_future_update(
-                dt_util.as_utc(midnight_candidate)
-            )  # Convert to UTC
+        # Roll over to the next day of the window at midnight.
+        self.async_schedule_rollover()
+
+        # Wake up exactly when the next prayer or iqamah time is reached.
+        self._scheduler.async_set_boundaries(
+            value for value in data.values() if isinstance(value, datetime)
+        )
         return data
@@ -0,0 +1,36 @@
+"""Diagnostics support for the Muslim Prayer Companion."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+
+TO_REDACT = {CONF_LATITUDE, CONF_LONGITUDE, "custom_iqamah_api"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, any]:
+    """Return the diagnostics of a config entry."""
+    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    return {
+        "entry": {
+            "data": async_redact_data(config_entry.data, TO_REDACT),
+            "options": async_redact_data(config_entry.options, TO_REDACT),
+        },
+        "calc_method": coordinator.calc_method,
+        "last_update_success": coordinator.last_update_success,
+        "performance": coordinator.get_diagnostics(),
+    }
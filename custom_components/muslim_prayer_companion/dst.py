@@ -0,0 +1,160 @@
+"""
+Daylight saving time handling for the Muslim Prayer Companion.
+
+UTC offsets are derived from the transitions of the configured time zone
+for a whole range of days at once. Mosque timetables that switch their
+clocks in a different week than the time zone (the "broken week" around
+the DST changes) are corrected in one vectorized pass, without comparing
+them against a reference calculation.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, date, datetime, time, timedelta, tzinfo
+from itertools import pairwise
+from typing import Final
+
+import numpy as np
+
+from .timetable import MISSING, minutes_to_datetime
+
+# Days between two samples of the UTC offset, at most one transition is
+# expected in between.
+TRANSITION_STEP: Final = 7
+# Day to day change of Maghrib above which a timetable is taken to have
+# switched its clock, sunset itself moves by a few minutes at most.
+CLOCK_CHANGE_MINUTES: Final = 30
+NOON: Final = time(12)
+
+
+def utc_offset_minutes(start: date, days: int, time_zone: tzinfo) -> np.ndarray:
+    """
+    Return the UTC offset at local noon of every day of a range.
+
+    The offset is sampled every TRANSITION_STEP days and bisected only where
+    it changes, so a year needs a few dozen zone lookups instead of one per day.
+
+    Args:
+        start (date): First day
+        days (int): Number of days
+        time_zone (tzinfo): Time zone of the timetable
+
+    Returns:
+        ndarray: UTC offset in minutes, one value per day
+
+    """
+
+    def offset_at(index: int) -> int:
+        moment = datetime.combine(start + timedelta(days=index), NOON, time_zone)
+        return int(moment.utcoffset().total_seconds()) // 60
+
+    offsets = np.empty(days, dtype=np.int16)
+    if days == 0:
+        return offsets
+    samples = [*range(0, days - 1, TRANSITION_STEP), days - 1]
+    values = {index: offset_at(index) for index in samples}
+    offsets[-1] = values[days - 1]
+    for low, high in pairwise(samples):
+        if values[low] == values[high]:
+            offsets[low:high] = values[low]
+            continue
+        # First day of the new offset.
+        before, after = low, high
+        while after - before > 1:
+            middle = (before + after) // 2
+            if offset_at(middle) == values[low]:
+                before = middle
+            else:
+                after = middle
+        offsets[low:after] = values[low]
+        offsets[after:high] = values[high]
+    return offsets
+
+
+def local_timestamps(start: date, minutes: np.ndarray, time_zone: tzinfo) -> np.ndarray:
+    """
+    Return the POSIX timestamps of a (days, prayers) timetable in a time zone.
+
+    The UTC offset at noon is applied to the whole day in one vectorized
+    pass, only the days of a transition are converted time by time.
+
+    Args:
+        start (date): First day of the timetable
+        minutes (ndarray): Minutes of the day, MISSING for unknown cells
+        time_zone (tzinfo): Time zone of the timetable
+
+    Returns:
+        ndarray: Timestamps in seconds, meaningless for MISSING cells
+
+    """
+    days = minutes.shape[0]
+    offsets = utc_offset_minutes(start, days, time_zone).astype(np.int64)
+    midnights = datetime.combine(start, time(), UTC).timestamp() + np.arange(
+        days, dtype=np.int64
+    ) * (24 * 60 * 60)
+    timestamps = (
+        midnights[:, None] + (minutes.astype(np.int64) - offsets[:, None]) * 60
+    ).astype(np.int64)
+    # The times before the transition still have the offset of the day before.
+    for index in np.flatnonzero(np.diff(offsets)) + 1:
+        day = start + timedelta(days=int(index))
+        timestamps[index] = [
+            minutes_to_datetime(day, int(value) % 1440, time_zone).timestamp()
+            for value in minutes[index]
+        ]
+    return timestamps
+
+
+def dst_correction(start: date, maghrib: np.ndarray, time_zone: tzinfo) -> np.ndarray:
+    """
+    Return the minutes to add to each day of a timetable to follow the time zone.
+
+    The clock changes of the timetable are read from the jumps of its Maghrib
+    column and compared to the transitions of the time zone. The timetable is
+    assumed to be right on most days, so the correction is anchored on its
+    most common value.
+
+    Args:
+        start (date): First day of the timetable
+        maghrib (ndarray): Maghrib minutes of the day, MISSING for unknown days
+        time_zone (tzinfo): Time zone of Home Assistant
+
+    Returns:
+        ndarray: Correction in minutes, one value per day, 0 for unknown days
+
+    """
+    correction = np.zeros(len(maghrib), dtype=np.int16)
+    known = np.flatnonzero(maghrib != MISSING)
+    if len(known) == 0:
+        return correction
+    jumps = np.diff(maghrib[known].astype(np.int32))
+    clock_changes = np.where(
+        np.abs(jumps) >= CLOCK_CHANGE_MINUTES, np.round(jumps / 60) * 60, 0
+    )
+    table_offsets = np.concatenate(([0], np.cumsum(clock_changes)))
+    zone_offsets = utc_offset_minutes(start, len(maghrib), time_zone)[known]
+    shift = (zone_offsets - zone_offsets[0]) - table_offsets
+    values, counts = np.unique(shift, return_counts=True)
+    correction[known] = shift - values[np.argmax(counts)]
+    return correction
+
+
+def apply_dst_correction(
+    start: date, minutes: np.ndarray, maghrib_column: int, time_zone: tzinfo
+) -> np.ndarray:
+    """
+    Correct a (days, prayers) timetable for the clock changes of the time zone.
+
+    Args:
+        start (date): First day of the timetable
+        minutes (ndarray): Minutes of the day, MISSING for unknown cells
+        maghrib_column (int): Column holding Maghrib
+        time_zone (tzinfo): Time zone of Home Assistant
+
+    Returns:
+        ndarray: Corrected minutes of the day, MISSING cells left untouched
+
+    """
+    correction = dst_correction(start, minutes[:, maghrib_column], time_zone)
+    corrected = (minutes.astype(np.int32) + correction[:, None]) % 1440
+    return np.where(minutes == MISSING, MISSING, corrected).astype(np.int16)
@@ -0,0 +1,211 @@
+"""
+Process wide timetable engine for the Muslim Prayer Companion.
+
+All the config entries share one engine. It holds the computed timetables,
+keyed by location and method, the mosque timetables, keyed by source, and
+the persistent cache, request coalescer and circuit breakers in front of
+them. Entries at the same mosque or in the same grid cell therefore share
+every fetch and computation, and an extra entry only costs its window.
+The daily refill of all the entries runs as one bulk refresh.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from random import SystemRandom
+from typing import TYPE_CHECKING, Final
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .breaker import CircuitBreaker
+from .bulk import FetchLimiter, RefreshReport, async_bulk_refresh
+from .calculation import compute_timetable
+from .coalesce import RequestCoalescer
+from .const import DOMAIN, LOGGER
+from .sources import SourceAdapter, SourceTimetable
+from .stats import SourceStats
+from .storage import TimetableCache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import date
+
+    from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+    from .timetable import Timetable
+    from .trigger import PrayerTrigger
+
+DATA_ENGINE: Final = f"{DOMAIN}_engine"
+# Days computed at once by the local calculation, from January 1st.
+CALCULATED_DAYS: Final = 400
+# Seconds after the midnight rollover within which the windows are refilled,
+# once the sites show the new day. The entries are spread evenly over it, at
+# a random phase so many instances do not hit the mosque sites at once.
+REFILL_DELAY: Final = (30 * 60, 3 * 60 * 60)
+_RANDOM: Final = SystemRandom()
+
+
+class TimetableEngine:
+    """Timetables, cache and source state shared by all the config entries."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self.cache = TimetableCache(hass)
+        self.limiter = FetchLimiter()
+        self.coalescer = RequestCoalescer()
+        self.calculated: dict[tuple[float, float, str, int], Timetable] = {}
+        self.source_tables: dict[str, SourceTimetable] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.stats: dict[str, SourceStats] = {}
+        self.last_refresh: RefreshReport | None = None
+        # Automation triggers, scheduled on the timers of their entries.
+        self.triggers: set[PrayerTrigger] = set()
+        self._refill_pending: set[MuslimPrayerCompanionDataUpdateCoordinator] = set()
+        self._unsub_refill: CALLBACK_TYPE | None = None
+
+    def get_calculated_timetable(
+        self, location: tuple[float, float], method: str, target_date: date
+    ) -> Timetable:
+        """Return the locally computed timetable of a grid cell covering target_date."""
+        # Keyed by year, so ranges across the new year do not recompute both.
+        key = (*location, method, target_date.year)
+        table = self.calculated.get(key)
+        if table is None:
+            table = compute_timetable(
+                *location,
+                method,
+                target_date.replace(month=1, day=1),
+                CALCULATED_DAYS,
+                dt_util.DEFAULT_TIME_ZONE,
+            )
+            self.calculated[key] = table
+        return table
+
+    @callback
+    def async_register_trigger(self, trigger: PrayerTrigger) -> CALLBACK_TYPE:
+        """
+        Schedule an automation trigger on the loaded entries it follows.
+
+        Entries loaded later schedule it with their first prayer times.
+
+        Args:
+            trigger (PrayerTrigger): Trigger of an automation
+
+        Returns:
+            CALLBACK_TYPE: Callback removing the trigger
+
+        """
+        self.triggers.add(trigger)
+        for coordinator in self.hass.data.get(DOMAIN, {}).values():
+            if trigger.follows(coordinator):
+                trigger.async_schedule(coordinator, dt_util.utcnow())
+
+        @callback
+        def async_remove() -> None:
+            self.triggers.discard(trigger)
+            trigger.async_cancel()
+
+        return async_remove
+
+    def get_source_timetable(self, adapter: SourceAdapter) -> SourceTimetable:
+        """Return the index of a timetable source, restored from the cache."""
+        table = self.source_tables.get(adapter.name)
+        if table is None:
+            table = self.source_tables[adapter.name] = SourceTimetable(
+                adapter.granularity
+            )
+            table.restore(self.cache.get_source(adapter.name))
+        return table
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Return the circuit breaker of a source."""
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name)
+        return breaker
+
+    def source_stats(self, name: str) -> SourceStats:
+        """Return the performance counters of a source."""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = SourceStats()
+        return stats
+
+    @callback
+    def async_schedule_refill(
+        self, coordinator: MuslimPrayerCompanionDataUpdateCoordinator
+    ) -> None:
+        """Refill the window of an entry with the next daily bulk refresh."""
+        self._refill_pending.add(coordinator)
+        if self._unsub_refill is None:
+            self._unsub_refill = async_call_later(
+                self.hass, REFILL_DELAY[0], self._async_bulk_refill
+            )
+
+    @callback
+    def async_cancel_refill(
+        self, coordinator: MuslimPrayerCompanionDataUpdateCoordinator
+    ) -> None:
+        """Drop an unloaded entry from the next bulk refresh."""
+        self._refill_pending.discard(coordinator)
+        if not self._refill_pending and self._unsub_refill:
+            self._unsub_refill()
+            self._unsub_refill = None
+
+    async def _async_bulk_refill(self, *_: object) -> None:
+        """Refill the windows of the pending entries, spread over the refill delay."""
+        self._unsub_refill = None
+        coordinators, self._refill_pending = self._refill_pending, set()
+        self.last_refresh = report = await self.async_refresh_all(
+            coordinators, REFILL_DELAY[1] - REFILL_DELAY[0], _RANDOM.random()
+        )
+        LOGGER.info(
+            "Refreshed %d entries (%d failed) in %.1f s, %.1f/s, p99 %.0f ms",
+            report.refreshed,
+            report.failed,
+            report.seconds,
+            report.per_second,
+            report.p99 * 1000,
+        )
+
+    async def async_refresh_all(
+        self,
+        coordinators: Iterable[MuslimPrayerCompanionDataUpdateCoordinator],
+        window: float = 0.0,
+        phase: float = 0.0,
+    ) -> RefreshReport:
+        """
+        Refresh many entries, their requests bounded by the shared limiter.
+
+        Args:
+            coordinators (Iterable): Coordinators of the entries to refresh
+            window (float): Seconds over which the refreshes start
+            phase (float): Fraction of the spacing the first refresh is delayed by
+
+        Returns:
+            RefreshReport: Throughput and latency of the refresh
+
+        """
+
+        async def refresh(
+            coordinator: MuslimPrayerCompanionDataUpdateCoordinator,
+        ) -> bool:
+            await coordinator.async_refresh()
+            return coordinator.last_update_success
+
+        return await async_bulk_refresh(
+            [partial(refresh, coordinator) for coordinator in coordinators],
+            window,
+            phase,
+        )
+
+
+@callback
+def async_get_engine(hass: HomeAssistant) -> TimetableEngine:
+    """Return the timetable engine, created with the first config entry."""
+    engine: TimetableEngine | None = hass.data.get(DATA_ENGINE)
+    if engine is None:
+        engine = hass.data[DATA_ENGINE] = TimetableEngine(hass)
+    return engine
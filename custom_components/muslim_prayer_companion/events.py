@@ -0,0 +1,172 @@
+"""
+Prayer event index for the Muslim Prayer Companion calendar.
+
+The prayers of a whole timetable are flattened into sorted arrays of start
+and end timestamps once, whenever the timetable changes. A calendar range
+query is then two bisections into these arrays, so week and month views
+are answered from memory without computing or fetching anything.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Final, NamedTuple
+
+import homeassistant.util.dt as dt_util
+import numpy as np
+
+from .const import EVENT_PRAYERS
+from .dst import local_timestamps
+from .timetable import COLUMNS, MISSING, Timetable
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from datetime import datetime, tzinfo
+
+# Length of an event without a known iqamah time, in minutes.
+DEFAULT_EVENT_MINUTES: Final = 15
+# Longest event, bounding how far before a range an overlapping event starts.
+MAX_EVENT_MINUTES: Final = 3 * 60
+
+
+class PrayerEvent(NamedTuple):
+    """A prayer from its time to its iqamah."""
+
+    prayer: str
+    start: datetime
+    end: datetime
+    iqamah: bool
+
+
+class PrayerEventIndex:
+    """Sorted prayer events of a timetable, queried by bisection."""
+
+    __slots__ = ("ends", "iqamah", "prayers", "starts")
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        prayers: np.ndarray,
+        iqamah: np.ndarray,
+    ) -> None:
+        """Initialize the index from parallel arrays sorted by start."""
+        self.starts = starts
+        self.ends = ends
+        self.prayers = prayers
+        # Whether each event ends at the iqamah.
+        self.iqamah = iqamah
+
+    def __len__(self) -> int:
+        """Return the number of events."""
+        return len(self.starts)
+
+    @classmethod
+    def from_timetable(
+        cls,
+        timetable: Timetable,
+        time_zone: tzinfo,
+        iqamah_offsets: Mapping[str, int] | None = None,
+        iqamah_minutes: np.ndarray | None = None,
+    ) -> PrayerEventIndex:
+        """
+        Build the index of the prayers of a timetable.
+
+        Args:
+            timetable (Timetable): Prayer times of a range of days
+            time_zone (tzinfo): Time zone of the timetable
+            iqamah_offsets (Mapping): Minutes from each prayer to its iqamah,
+                events last DEFAULT_EVENT_MINUTES without it
+            iqamah_minutes (np.ndarray): Iqamah times of each day instead of
+                the offsets, in EVENT_PRAYERS order, MISSING when unknown
+
+        Returns:
+            PrayerEventIndex: Events of every known prayer time
+
+        """
+        columns = [COLUMNS[prayer] for prayer in EVENT_PRAYERS]
+        minutes = timetable.minutes[:, columns]
+        starts = local_timestamps(timetable.start, minutes, time_zone)
+        if iqamah_offsets is None:
+            durations = np.full(len(EVENT_PRAYERS), DEFAULT_EVENT_MINUTES)
+        else:
+            durations = np.array(
+                [iqamah_offsets.get(prayer, 0) for prayer in EVENT_PRAYERS]
+            )
+        durations = np.clip(durations, 1, MAX_EVENT_MINUTES)
+        ends = starts + durations * 60
+        iqamah = np.full(minutes.shape, iqamah_offsets is not None)
+        if iqamah_minutes is not None:
+            iqamah_ends = local_timestamps(timetable.start, iqamah_minutes, time_zone)
+            iqamah = (
+                (iqamah_minutes != MISSING)
+                & (iqamah_ends > starts)
+                & (iqamah_ends <= starts + MAX_EVENT_MINUTES * 60)
+            )
+            ends = np.where(iqamah, iqamah_ends, ends)
+        prayers = np.broadcast_to(np.arange(len(EVENT_PRAYERS)), minutes.shape)
+        known = (minutes != MISSING).ravel()
+        starts, ends, prayers, iqamah = (
+            values.ravel()[known] for values in (starts, ends, prayers, iqamah)
+        )
+        # Rows are in the order of the day, sort anyway for unusual timetables.
+        order = np.argsort(starts, kind="stable")
+        return cls(starts[order], ends[order], prayers[order], iqamah[order])
+
+    def _event(self, index: int) -> PrayerEvent:
+        """Build the event at an index of the arrays."""
+        return PrayerEvent(
+            EVENT_PRAYERS[self.prayers[index]],
+            dt_util.utc_from_timestamp(int(self.starts[index])),
+            dt_util.utc_from_timestamp(int(self.ends[index])),
+            bool(self.iqamah[index]),
+        )
+
+    def between(self, start: datetime, end: datetime) -> list[PrayerEvent]:
+        """Return the events overlapping the range from start to end."""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        first = np.searchsorted(self.starts, start_ts - MAX_EVENT_MINUTES * 60)
+        last = np.searchsorted(self.starts, end_ts)
+        return [
+            self._event(index)
+            for index in range(first, last)
+            if self.ends[index] > start_ts
+        ]
+
+    def current_or_next(self, now: datetime) -> PrayerEvent | None:
+        """Return the event in progress at now, or the next one."""
+        now_ts = now.timestamp()
+        first = np.searchsorted(self.starts, now_ts - MAX_EVENT_MINUTES * 60)
+        for index in range(first, len(self)):
+            if self.ends[index] > now_ts:
+                return self._event(index)
+        return None
+
+    def next_time(
+        self, prayer: str, after: datetime, *, iqamah: bool = False
+    ) -> datetime | None:
+        """
+        Return the first time of a prayer, or of its iqamah, after a moment.
+
+        Args:
+            prayer (str): One of EVENT_PRAYERS
+            after (datetime): Moment the time must follow
+            iqamah (bool): Whether to return the iqamah, the end of the event
+
+        Returns:
+            datetime: Time in UTC, None past the end of the index
+
+        """
+        after_ts = after.timestamp()
+        times = self.ends if iqamah else self.starts
+        margin = MAX_EVENT_MINUTES * 60 if iqamah else 0
+        prayer_index = EVENT_PRAYERS.index(prayer)
+        first = np.searchsorted(self.starts, after_ts - margin, side="right")
+        # Within a day or so of events from the bisection.
+        for index in range(first, len(self)):
+            if (
+                self.prayers[index] == prayer_index
+                and times[index] > after_ts
+                and (self.iqamah[index] or not iqamah)
+            ):
+                return dt_util.utc_from_timestamp(int(times[index]))
+        return None
@@ -0,0 +1,139 @@
+"""
+Chunked CSV and iCalendar export of the Muslim Prayer Companion timetables.
+
+The exports are generators of text chunks of CHUNK_DAYS days each, so a
+timetable of several years is written with the memory of a single month.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import timedelta, tzinfo
+from typing import TYPE_CHECKING, Final
+
+from .const import DOMAIN, EVENT_PRAYERS, NAME, TIMETABLE_PRAYERS
+from .events import PrayerEventIndex
+from .timetable import MISSING, Timetable, format_minutes
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping
+    from pathlib import Path
+
+    import numpy as np
+
+# Days formatted at once.
+CHUNK_DAYS: Final = 31
+EXPORT_FORMATS: Final = ("csv", "ical")
+# Extension of the files of each format.
+EXPORT_SUFFIXES: Final = {"csv": ".csv", "ical": ".ics"}
+ICAL_TIME_FORMAT: Final = "%Y%m%dT%H%M%SZ"
+
+
+def timetable_chunks(timetable: Timetable) -> Iterator[Timetable]:
+    """Split a timetable into consecutive timetables of CHUNK_DAYS days."""
+    for offset in range(0, len(timetable), CHUNK_DAYS):
+        yield Timetable(
+            timetable.start + timedelta(days=offset),
+            timetable.minutes[offset : offset + CHUNK_DAYS],
+        )
+
+
+def iter_csv(timetable: Timetable) -> Iterator[str]:
+    """
+    Format a timetable as CSV, one row of HH:MM times per day.
+
+    Args:
+        timetable (Timetable): Prayer times of a range of days
+
+    Returns:
+        Iterator[str]: Header, then the rows of each chunk of days
+
+    """
+    yield ",".join(("Date", *TIMETABLE_PRAYERS)) + "\r\n"
+    for chunk in timetable_chunks(timetable):
+        yield "".join(
+            ",".join(
+                (
+                    day.isoformat(),
+                    *(
+                        format_minutes(int(value)) if value != MISSING else ""
+                        for value in row
+                    ),
+                )
+            )
+            + "\r\n"
+            for day, row in zip(chunk.dates(), chunk.minutes, strict=True)
+        )
+
+
+def iter_ical(
+    timetable: Timetable,
+    time_zone: tzinfo,
+    iqamah_offsets: Mapping[str, int] | None = None,
+    iqamah_minutes: np.ndarray | None = None,
+) -> Iterator[str]:
+    """
+    Format the prayers of a timetable as an iCalendar, one event per prayer.
+
+    Args:
+        timetable (Timetable): Prayer times of a range of days
+        time_zone (tzinfo): Time zone of the timetable
+        iqamah_offsets (Mapping): Minutes from each prayer to its iqamah
+        iqamah_minutes (np.ndarray): Iqamah times of each day instead, see
+            PrayerEventIndex.from_timetable
+
+    Returns:
+        Iterator[str]: Calendar header, the events of each chunk of days, then
+            the calendar footer
+
+    """
+    stamp = time.strftime(ICAL_TIME_FORMAT, time.gmtime())
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        f"PRODID:-//{NAME}//{DOMAIN}//EN\r\n"
+        f"X-WR-CALNAME:{NAME}\r\n"
+    )
+    for chunk in timetable_chunks(timetable):
+        offset = (chunk.start - timetable.start).days
+        index = PrayerEventIndex.from_timetable(
+            chunk,
+            time_zone,
+            iqamah_offsets,
+            None if iqamah_minutes is None else iqamah_minutes[offset:][:CHUNK_DAYS],
+        )
+        yield "".join(
+            "BEGIN:VEVENT\r\n"
+            f"UID:{int(start)}-{EVENT_PRAYERS[prayer]}@{DOMAIN}\r\n"
+            f"DTSTAMP:{stamp}\r\n"
+            f"DTSTART:{time.strftime(ICAL_TIME_FORMAT, time.gmtime(int(start)))}\r\n"
+            f"DTEND:{time.strftime(ICAL_TIME_FORMAT, time.gmtime(int(end)))}\r\n"
+            f"SUMMARY:{EVENT_PRAYERS[prayer]}\r\n"
+            "END:VEVENT\r\n"
+            for start, end, prayer in zip(
+                index.starts, index.ends, index.prayers, strict=True
+            )
+        )
+    yield "END:VCALENDAR\r\n"
+
+
+def write_chunks(path: Path, chunks: Iterable[str]) -> int:
+    """
+    Write text chunks to a file, creating its directory.
+
+    Blocking, run it in the executor.
+
+    Args:
+        path (Path): File to write
+        chunks (Iterable[str]): Text to write, one chunk at a time
+
+    Returns:
+        int: Number of characters written
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with path.open("w", encoding="utf-8", newline="") as file:
+        for chunk in chunks:
+            written += file.write(chunk)
+    return written
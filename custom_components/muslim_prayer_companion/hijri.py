@@ -0,0 +1,166 @@
+"""
+Local Gregorian to Hijri conversion for the Muslim Prayer Companion.
+
+Dates are converted with the precomputed Umm al-Qura month-start table
+shipped by ``hijri_converter`` (1343-1500 AH), looked up with a bisection.
+Outside of the table the tabular (arithmetic) Islamic calendar is used,
+anchored on the end of the table past it so the days run on. An optional day
+adjustment accounts for local moon sighting.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Final, NamedTuple
+
+import numpy as np
+from hijri_converter import ummalqura
+
+# The month names of hijri_converter, which writes the ayn as U+2019.
+HIJRI_MONTHS: Final = (
+    "Muharram",
+    "Safar",
+    "Rabi\u2019 al-Awwal",
+    "Rabi\u2019 al-Thani",
+    "Jumada al-Ula",
+    "Jumada al-Akhirah",
+    "Rajab",
+    "Sha\u2019ban",
+    "Ramadhan",
+    "Shawwal",
+    "Dhu al-Qi\u2019dah",
+    "Dhu al-Hijjah",
+)
+
+# Month starts as reduced Julian days (JDN - 2400000), and months elapsed
+# before the first entry.
+MONTH_STARTS: Final = ummalqura.MONTH_STARTS
+MONTH_STARTS_ARRAY: Final = np.array(MONTH_STARTS, dtype=np.int64)
+HIJRI_OFFSET: Final = ummalqura.HIJRI_OFFSET
+# Difference between a date ordinal and its reduced Julian day.
+ORDINAL_TO_RJD: Final = 1721425 - 2400000
+# Julian day number of 1 Muharram 1 AH in the tabular calendar, minus one.
+TABULAR_EPOCH: Final = 1948439
+
+
+class HijriDate(NamedTuple):
+    """A date of the Hijri calendar."""
+
+    year: int
+    month: int
+    day: int
+
+    @property
+    def month_name(self) -> str:
+        """Return the English name of the month."""
+        return HIJRI_MONTHS[self.month - 1]
+
+
+def _tabular_month_start(year: int, month: int) -> int:
+    """Return the Julian day number of the first day of a tabular Hijri month."""
+    return (
+        (59 * (month - 1) + 1) // 2
+        + (year - 1) * 354
+        + (3 + 11 * year) // 30
+        + TABULAR_EPOCH
+    )
+
+
+def _tabular_from_jdn(jdn: int) -> HijriDate:
+    """Convert a Julian day number with the tabular Islamic calendar."""
+    year = (30 * (jdn - TABULAR_EPOCH) + 10646) // 10631
+    month = min(12, (jdn - _tabular_month_start(year, 1)) * 2 // 59 + 1)
+    while month > 1 and _tabular_month_start(year, month) > jdn:
+        month -= 1
+    return HijriDate(year, month, jdn - _tabular_month_start(year, month) + 1)
+
+
+# Days from the last entry of the table, the first month past it, to the same
+# month of the tabular calendar.
+_LAST_YEAR, _LAST_MONTH = divmod(HIJRI_OFFSET + len(MONTH_STARTS) - 1, 12)
+TABULAR_SHIFT: Final = _tabular_month_start(_LAST_YEAR + 1, _LAST_MONTH + 1) - (
+    MONTH_STARTS[-1] + 2400000
+)
+
+
+def _from_month_index(index: int, rjd: int) -> HijriDate:
+    """Build the Hijri date of rjd from its index in the month-start table."""
+    months = index + HIJRI_OFFSET
+    return HijriDate(months // 12 + 1, months % 12 + 1, rjd - MONTH_STARTS[index] + 1)
+
+
+def to_hijri(day: date, adjustment: int = 0) -> HijriDate:
+    """
+    Convert a Gregorian date to the Hijri calendar.
+
+    Args:
+        day (date): Gregorian date
+        adjustment (int): Days added for local moon sighting, e.g. -1 or 1
+
+    Returns:
+        HijriDate: Umm al-Qura date, or tabular date outside of the table
+
+    """
+    rjd = day.toordinal() + adjustment + ORDINAL_TO_RJD
+    index = bisect_right(MONTH_STARTS, rjd) - 1
+    if 0 <= index < len(MONTH_STARTS) - 1:
+        return _from_month_index(index, rjd)
+    if index >= 0:
+        return _tabular_from_jdn(rjd + 2400000 + TABULAR_SHIFT)
+    return _tabular_from_jdn(rjd + 2400000)
+
+
+def to_hijri_range(start: date, days: int, adjustment: int = 0) -> list[HijriDate]:
+    """
+    Convert consecutive Gregorian dates to the Hijri calendar in bulk.
+
+    Args:
+        start (date): First Gregorian date
+        days (int): Number of dates to convert
+        adjustment (int): Days added for local moon sighting
+
+    Returns:
+        list: Hijri date of every day
+
+    """
+    first = start.toordinal() + adjustment + ORDINAL_TO_RJD
+    rjds = np.arange(first, first + days)
+    indexes = np.searchsorted(MONTH_STARTS_ARRAY, rjds, side="right") - 1
+    in_table = (indexes >= 0) & (indexes < len(MONTH_STARTS) - 1)
+    return [
+        (
+            _from_month_index(int(index), int(rjd))
+            if inside
+            else to_hijri(start + timedelta(days=offset), adjustment)
+        )
+        for offset, (rjd, index, inside) in enumerate(
+            zip(rjds, indexes, in_table, strict=True)
+        )
+    ]
+
+
+def hijri_date_info(day: date, adjustment: int = 0) -> dict[str, str]:
+    """
+    Return the Hijri date sensor values of a Gregorian date.
+
+    Args:
+        day (date): Gregorian date
+        adjustment (int): Days added for local moon sighting
+
+    Returns:
+        dict: Values of the seven hijri_* keys
+
+    """
+    hijri = to_hijri(day, adjustment)
+    hijri_day = f"{hijri.day:02d}"
+    hijri_year = str(hijri.year)
+    return {
+        "hijri_date": f"{hijri_day}-{hijri.month:02d}-{hijri_year}",  # DD-MM-YYYY
+        "hijri_day": hijri_day,
+        "hijri_month_num": hijri.month,
+        "hijri_month_readable": hijri.month_name,
+        "hijri_year": hijri_year,
+        "hijri_date_readable": f"{hijri_day}-{hijri.month_name}-{hijri_year}",
+        "hijri_day_month_readable": f"{hijri_day}-{hijri.month_name}",
+    }
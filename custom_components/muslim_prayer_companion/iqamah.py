@@ -0,0 +1,164 @@
+"""
+Per day cache of the Muslim Prayer Companion iqamah API.
+
+Mosques publish iqamah times that change weekly or monthly, so the API may
+return a whole schedule instead of the times of a single day:
+
+- ``{"Fajr": "HH:MM", ...}``: the times of today
+- ``{"YYYY-MM-DD": {"Fajr": "HH:MM", ...}, ...}``: the times of each day
+- ``[{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "Fajr": "HH:MM", ...}, ...]``:
+  the times of each range of days, ``end`` defaulting to ``start``
+
+The days are cached with the validators of the response and revalidated
+with a conditional request once the TTL has passed, or when today is not in
+the schedule. A day missing from the schedule keeps the times of the last
+day before it, as iqamah times hold until the mosque changes them.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Final
+
+import homeassistant.util.dt as dt_util
+import numpy as np
+
+from .const import EVENT_PRAYERS
+from .timetable import MISSING, parse_minutes
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+CACHE_VERSION: Final = 1
+
+
+def _parse_row(times: dict) -> list[int]:
+    """Convert the HH:MM iqamah times of a day to minutes, in EVENT_PRAYERS order."""
+    row = []
+    for prayer in EVENT_PRAYERS:
+        try:
+            row.append(parse_minutes(times[prayer]))
+        except (KeyError, TypeError, ValueError):
+            row.append(MISSING)
+    return row
+
+
+def parse_iqamah_payload(json_resp: object, today: date) -> dict[date, list[int]]:
+    """
+    Index an iqamah API response by day.
+
+    Args:
+        json_resp (object): Response of the iqamah API, in one of the module formats
+        today (date): Day of the times of a single day response
+
+    Returns:
+        dict: Minutes of the iqamah of EVENT_PRAYERS of each day
+
+    Raises:
+        ValueError: If the response is in none of the formats
+
+    """
+    if isinstance(json_resp, dict):
+        if any(prayer in json_resp for prayer in EVENT_PRAYERS):
+            return {today: _parse_row(json_resp)}
+        return {
+            date.fromisoformat(day): _parse_row(times)
+            for day, times in json_resp.items()
+        }
+    if isinstance(json_resp, list):
+        days = {}
+        for schedule in json_resp:
+            start = date.fromisoformat(schedule["start"])
+            end = date.fromisoformat(schedule.get("end", schedule["start"]))
+            row = _parse_row(schedule)
+            for offset in range((end - start).days + 1):
+                days[start + timedelta(days=offset)] = row
+        return days
+    msg = f"unsupported iqamah payload: {type(json_resp).__name__}"
+    raise ValueError(msg)
+
+
+class IqamahTimetable:
+    """Iqamah times of the days of the last API response, and its validators."""
+
+    __slots__ = ("_sorted", "checked", "days", "etag", "last_modified")
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self.days: dict[date, list[int]] = {}
+        self._sorted: list[date] = []
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.checked: datetime | None = None
+
+    @property
+    def validators(self) -> dict[str, str | None]:
+        """Return the validators for a conditional request."""
+        return {"etag": self.etag, "last_modified": self.last_modified}
+
+    def needs_refresh(self, today: date, ttl: timedelta) -> bool:
+        """Return whether the TTL has passed or today is not in the schedule."""
+        return (
+            self.checked is None
+            or dt_util.utcnow() - self.checked >= ttl
+            or today not in self.days
+        )
+
+    def update(
+        self,
+        days: dict[date, list[int]] | None,
+        validators: dict[str, str | None],
+    ) -> None:
+        """
+        Store a response, or only the revalidation of the cached one.
+
+        Args:
+            days (dict): Parsed response, None if not modified
+            validators (dict): ETag and Last-Modified of the response
+
+        """
+        if days is not None:
+            self.days.update(days)
+            self.etag = validators.get("etag")
+            self.last_modified = validators.get("last_modified")
+        self.checked = dt_util.utcnow()
+        # Keep the last day before today, carried over to the next ones.
+        today = dt_util.now().date()
+        past = [day for day in self.days if day < today]
+        for day in sorted(past)[:-1]:
+            del self.days[day]
+        self._sorted = sorted(self.days)
+
+    def get_day(self, day: date) -> list[int] | None:
+        """Return the iqamah minutes of a day, or of the last day before it."""
+        index = bisect_right(self._sorted, day)
+        return self.days[self._sorted[index - 1]] if index else None
+
+    def get_range(self, days: Iterable[date]) -> np.ndarray:
+        """Return the (days, EVENT_PRAYERS) iqamah minutes of some days."""
+        rows = [self.get_day(day) or [MISSING] * len(EVENT_PRAYERS) for day in days]
+        return np.array(rows, dtype=np.int16).reshape(-1, len(EVENT_PRAYERS))
+
+    def as_dict(self) -> dict:
+        """Return the cache as JSON serializable data."""
+        return {
+            "version": CACHE_VERSION,
+            "days": {day.isoformat(): row for day, row in self.days.items()},
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "checked": self.checked.isoformat() if self.checked else None,
+        }
+
+    def restore(self, data: dict | None) -> None:
+        """Restore the cache from data returned by as_dict."""
+        if not data or data.get("version") != CACHE_VERSION:
+            return
+        self.days = {
+            date.fromisoformat(day): row for day, row in data.get("days", {}).items()
+        }
+        self._sorted = sorted(self.days)
+        self.etag = data.get("etag")
+        self.last_modified = data.get("last_modified")
+        if data.get("checked"):
+            self.checked = dt_util.parse_datetime(data["checked"])
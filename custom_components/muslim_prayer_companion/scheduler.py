@@ -0,0 +1,156 @@
+"""
+Prayer boundary scheduler for the Muslim Prayer Companion.
+
+Upcoming prayer and iqamah times are kept in a min-heap and a single
+``async_track_point_in_time`` timer is armed for the nearest one, so the
+derived state (next prayer, rolled forward times) changes exactly when a
+boundary is crossed, without any polling in between.
+
+Automation triggers share the same heap and timer: scheduling or cancelling
+one is a heap push or a flag, so each trigger costs O(log n) however many
+automations there are.
+"""
+
+from __future__ import annotations
+
+import heapq
+from itertools import count
+from typing import TYPE_CHECKING
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from datetime import datetime
+
+
+class _Job:
+    """Entry of the heap, a boundary when it has no action of its own."""
+
+    __slots__ = ("action", "cancelled", "seq", "when")
+
+    def __init__(
+        self, when: datetime, seq: int, action: Callable[[datetime], None] | None
+    ) -> None:
+        self.when = when
+        self.seq = seq
+        self.action = action
+        self.cancelled = False
+
+    def __lt__(self, other: _Job) -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class BoundaryScheduler:
+    """Single timer for the nearest of a heap of upcoming boundaries and jobs."""
+
+    def __init__(self, hass: HomeAssistant, action: Callable[[datetime], None]) -> None:
+        """Initialize the scheduler with the callback run at each boundary."""
+        self.hass = hass
+        self._action = action
+        self._heap: list[_Job] = []
+        self._seq = count()
+        self._unsub: CALLBACK_TYPE | None = None
+        self._armed_at: datetime | None = None
+
+    @property
+    def next_boundary(self) -> datetime | None:
+        """Return the time the timer is armed for."""
+        return self._heap[0].when if self._heap else None
+
+    @property
+    def jobs(self) -> int:
+        """Return the number of scheduled jobs, boundaries excluded."""
+        return sum(
+            1 for job in self._heap if job.action is not None and not job.cancelled
+        )
+
+    @callback
+    def async_set_boundaries(self, boundaries: Iterable[datetime]) -> None:
+        """Replace the upcoming boundaries and re-arm the timer."""
+        now = dt_util.utcnow()
+        # Cancelled jobs are dropped on the way.
+        self._heap = [
+            job for job in self._heap if job.action is not None and not job.cancelled
+        ]
+        self._heap.extend(
+            _Job(boundary, next(self._seq), None)
+            for boundary in set(boundaries)
+            if boundary > now
+        )
+        heapq.heapify(self._heap)
+        self._async_arm()
+
+    @callback
+    def async_schedule(
+        self, when: datetime, action: Callable[[datetime], None]
+    ) -> CALLBACK_TYPE:
+        """
+        Run an action at a given time on the shared timer.
+
+        Args:
+            when (datetime): Time to run the action at
+            action (Callable): Callback run with the time the timer fired
+
+        Returns:
+            CALLBACK_TYPE: Callback cancelling the job
+
+        """
+        job = _Job(when, next(self._seq), action)
+        heapq.heappush(self._heap, job)
+        if self._heap[0] is job:
+            self._async_arm()
+
+        @callback
+        def cancel() -> None:
+            # Left in the heap, skipped when popped.
+            job.cancelled = True
+
+        return cancel
+
+    @callback
+    def _async_arm(self) -> None:
+        """Arm the timer for the nearest boundary or job."""
+        when = self._heap[0].when if self._heap else None
+        if when == self._armed_at:
+            return
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        self._armed_at = when
+        if when is not None:
+            self._unsub = async_track_point_in_time(
+                self.hass, self._async_boundary_reached, when
+            )
+
+    @callback
+    def _async_boundary_reached(self, now: datetime) -> None:
+        """Pop the passed boundaries and jobs and run their actions."""
+        self._unsub = None
+        self._armed_at = None
+        boundary = False
+        due: list[_Job] = []
+        while self._heap and self._heap[0].when <= now:
+            job = heapq.heappop(self._heap)
+            if job.action is None:
+                boundary = True
+            elif not job.cancelled:
+                due.append(job)
+        if boundary:
+            self._action(now)
+        for job in due:
+            job.action(now)
+        self._async_arm()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel the timer and every boundary and job."""
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        self._armed_at = None
+        for job in self._heap:
+            job.cancelled = True
+        self._heap.clear()
@@ -1,19 +1,27 @@
 """Platform to retrieve Muslim Prayer Companion information for Home Assistant."""
 
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime
 from logging import getLogger
 
 from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
-from homeassistant.components.sensor.const import SensorDeviceClass
+from homeassistant.components.sensor.const import SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util.dt import parse_datetime
 
-from . import MuslimPrayerCompanionDataUpdateCoordinator
-from .const import DOMAIN, NAME
+from .const import DOMAIN
+from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
 
 _LOGGER = getLogger(__package__)
 SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
@@ -74,6 +82,88 @@ SENSOR_TYPES: tuple[SensorEntityDescription, ...] = (
 )
 
 
+@dataclass(frozen=True, kw_only=True)
+class MuslimPrayerCompanionDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reading the performance counters of the coordinator."""
+
+    value_fn: Callable[[dict[str, any]], StateType | datetime]
+    attributes_fn: Callable[[dict[str, any]], dict[str, any]] | None = None
+
+
+def _timetable_source(diagnostics: dict[str, any]) -> dict[str, any]:
+    """Return the counters of the mosque timetable source, empty if none."""
+    return diagnostics["sources"].get(diagnostics["timetable_source"], {})
+
+
+def _cache_hit_ratio(diagnostics: dict[str, any]) -> float | None:
+    """Return the hit ratio of the mosque timetable, else of the coalesced requests."""
+    ratio = _timetable_source(diagnostics).get("cache_hit_ratio")
+    if ratio is None:
+        ratio = diagnostics["requests"]["hit_ratio"]
+    return ratio
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a latency in seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _percentage(ratio: float | None) -> float | None:
+    """Convert a ratio to a rounded percentage."""
+    return None if ratio is None else round(ratio * 100, 1)
+
+
+# Disabled by default, enabled to alert on slow sources or check the caching.
+DIAGNOSTIC_SENSOR_TYPES: tuple[
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription, ...
+] = (
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="source_latency",
+        name="Timetable Source Latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=lambda diag: _milliseconds(
+            _timetable_source(diag).get("mean_latency")
+        ),
+        attributes_fn=lambda diag: _timetable_source(diag).get("latency_histogram", {}),
+    ),
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="cache_hit_ratio",
+        name="Timetable Cache Hit Ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda diag: _percentage(_cache_hit_ratio(diag)),
+        attributes_fn=lambda diag: diag["requests"],
+    ),
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="bytes_downloaded",
+        name="Bytes Downloaded",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda diag: sum(
+            source["bytes"] for source in diag["sources"].values()
+        ),
+    ),
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="fallback_count",
+        name="ISNA Fallbacks",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda diag: diag["fallback_count"],
+    ),
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="last_source_success",
+        name="Last Timetable Download",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda diag: _timetable_source(diag).get("last_success"),
+    ),
+    MuslimPrayerCompanionDiagnosticSensorEntityDescription(
+        key="scheduled_timers",
+        name="Scheduled Timers",
+        value_fn=lambda diag: diag["scheduled_timers"],
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -82,11 +172,17 @@ async def async_setup_entry(
     """
     Set up the Muslim Prayer Companion sensor platform.
     """
-    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN]
+    coordinator: MuslimPrayerCompanionDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
     async_add_entities(
         MuslimPrayerCompanionTimeSensor(coordinator, description)
         for description in SENSOR_TYPES
     )
+    async_add_entities(
+        MuslimPrayerCompanionDiagnosticSensor(coordinator, description)
+        for description in DIAGNOSTIC_SENSOR_TYPES
+    )
 
 
 class MuslimPrayerCompanionTimeSensor(
@@ -105,11 +201,24 @@ class MuslimPrayerCompanionTimeSensor(
         super().__init__(coordinator)
         self.entity_description = description
         self._attr_unique_id = f"{description.key}_{coordinator.config_entry.entry_id}"
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, coordinator.config_entry.entry_id)},
-            name=NAME,
-            entry_type=DeviceEntryType.SERVICE,
-        )
+        self._attr_device_info = coordinator.device_info
+        # Coordinator keys this sensor's state and attributes are built from.
+        self._data_keys = {description.key, "stale"}
+        if description.key == "next_prayer":
+            self._data_keys.add("next_prayer_name")
+        self._last_available: bool | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when this sensor's value or availability changed."""
+        available = self.available
+        if (
+            self.coordinator.changed_keys.isdisjoint(self._data_keys)
+            and available == self._last_available
+        ):
+            return
+        self._last_available = available
+        super()._handle_coordinator_update()
 
     @property
     def native_value(self):
@@ -136,7 +245,7 @@ class MuslimPrayerCompanionTimeSensor(
                         type(value),
                     )
                     return None
-            except Exception as e:
+            except ValueError as e:
                 _LOGGER.error(
                     "Error parsing datetime for %s: %s", self.entity_description.key, e
                 )
@@ -147,10 +256,45 @@ class MuslimPrayerCompanionTimeSensor(
     @property
     def extra_state_attributes(self) -> dict[str, any]:
         """Return additional attributes for the sensor."""
-        attrs = {}
+        # Set while a source is failing and the last known data is served.
+        attrs = {"stale": bool(self.coordinator.data.get("stale"))}
         # For the "next_prayer" sensor, add the prayer name.
         if self.entity_description.key == "next_prayer":
             next_prayer_name = self.coordinator.data.get("next_prayer_name")
             if next_prayer_name:
                 attrs["prayer"] = next_prayer_name
         return attrs
+
+
+class MuslimPrayerCompanionDiagnosticSensor(
+    CoordinatorEntity[MuslimPrayerCompanionDataUpdateCoordinator], SensorEntity
+):
+    """Performance counter of a Muslim Prayer Companion entry."""
+
+    entity_description: MuslimPrayerCompanionDiagnosticSensorEntityDescription
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: MuslimPrayerCompanionDataUpdateCoordinator,
+        description: MuslimPrayerCompanionDiagnosticSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{description.key}_{coordinator.config_entry.entry_id}"
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the value of the counter."""
+        return self.entity_description.value_fn(self.coordinator.get_diagnostics())
+
+    @property
+    def extra_state_attributes(self) -> dict[str, any] | None:
+        """Return the details of the counter, e.g. the latency histogram."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self.coordinator.get_diagnostics())
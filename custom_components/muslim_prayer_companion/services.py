@@ -0,0 +1,166 @@
+"""Services of the Muslim Prayer Companion."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+import homeassistant.util.dt as dt_util
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import (
+    ServiceValidationError,
+    Unauthorized,
+    UnknownUser,
+)
+from homeassistant.helpers import config_validation as cv
+
+from .const import CALC_METHODS, DOMAIN, SERVICE_GET_TIMETABLE
+from .export import (
+    EXPORT_FORMATS,
+    EXPORT_SUFFIXES,
+    iter_csv,
+    iter_ical,
+    write_chunks,
+)
+from .timetable import row_to_times
+
+if TYPE_CHECKING:
+    from datetime import date
+
+    from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+
+ATTR_CONFIG_ENTRY_ID: Final = "config_entry_id"
+ATTR_START_DATE: Final = "start_date"
+ATTR_END_DATE: Final = "end_date"
+ATTR_METHOD: Final = "method"
+ATTR_FORMAT: Final = "format"
+ATTR_FILENAME: Final = "filename"
+# Longest range of a request, five years.
+MAX_TIMETABLE_DAYS: Final = 5 * 366
+# Directory of the exported files under the configuration directory, served
+# at /local/muslim_prayer_companion.
+EXPORT_DIR: Final = ("www", DOMAIN)
+
+GET_TIMETABLE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Required(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_METHOD): vol.In(list(CALC_METHODS.values())),
+        vol.Inclusive(ATTR_FORMAT, "file"): vol.In(EXPORT_FORMATS),
+        vol.Inclusive(ATTR_FILENAME, "file"): cv.string,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_get_timetable(call: ServiceCall) -> ServiceResponse:
+        """Return or export the prayer times of a range of days."""
+        await _async_check_admin(hass, call)
+        coordinator = _get_coordinator(hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+        start: date = call.data[ATTR_START_DATE]
+        days = (call.data[ATTR_END_DATE] - start).days + 1
+        if not 0 < days <= MAX_TIMETABLE_DAYS:
+            msg = (
+                "The end date must follow the start date by at most "
+                f"{MAX_TIMETABLE_DAYS} days"
+            )
+            raise ServiceValidationError(msg)
+        method = call.data.get(ATTR_METHOD, coordinator.calc_method)
+        if filename := call.data.get(ATTR_FILENAME):
+            path = await _async_export_path(hass, filename, call.data[ATTR_FORMAT])
+        timetable = await coordinator.async_get_timetable(start, days, method)
+
+        if filename:
+            if call.data[ATTR_FORMAT] == "csv":
+                chunks = iter_csv(timetable)
+            else:
+                chunks = iter_ical(
+                    timetable,
+                    dt_util.DEFAULT_TIME_ZONE,
+                    coordinator.iqamah_offsets,
+                    coordinator.get_iqamah_minutes(timetable),
+                )
+            await hass.async_add_executor_job(write_chunks, path, chunks)
+            response = {"file": str(path), "days": days}
+        else:
+            response = {
+                "method": method,
+                "days": [
+                    {"date": day.isoformat(), **row_to_times(row)}
+                    for day, row in zip(
+                        timetable.dates(), timetable.minutes, strict=True
+                    )
+                ],
+            }
+        return response if call.return_response else None
+
+    # Registered once from async_setup, for as long as Home Assistant runs.
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TIMETABLE,
+        async_get_timetable,
+        schema=GET_TIMETABLE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _get_coordinator(
+    hass: HomeAssistant, entry_id: str | None
+) -> MuslimPrayerCompanionDataUpdateCoordinator:
+    """Return the coordinator of an entry, the only one by default."""
+    coordinators = hass.data.get(DOMAIN, {})
+    if entry_id is None and len(coordinators) == 1:
+        return next(iter(coordinators.values()))
+    if entry_id not in coordinators:
+        msg = (
+            f"Set {ATTR_CONFIG_ENTRY_ID} to one of the loaded entries: "
+            f"{', '.join(coordinators)}"
+        )
+        raise ServiceValidationError(msg)
+    return coordinators[entry_id]
+
+
+async def _async_check_admin(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Refuse the call of a user who is not an administrator, as admin services do."""
+    if call.context.user_id:
+        user = await hass.auth.async_get_user(call.context.user_id)
+        if user is None:
+            raise UnknownUser(context=call.context)
+        if not user.is_admin:
+            raise Unauthorized(context=call.context)
+
+
+async def _async_export_path(
+    hass: HomeAssistant, filename: str, export_format: str
+) -> Path:
+    """
+    Return the path of an export.
+
+    Exports are files of the export directory with the extension of their
+    format, so that a call cannot overwrite any other file.
+    """
+    suffix = EXPORT_SUFFIXES[export_format]
+    path = Path(hass.config.path(*EXPORT_DIR, filename))
+    if Path(filename).name != filename or path.suffix != suffix:
+        msg = f"{ATTR_FILENAME} must be a {suffix} file name, without directories"
+        raise ServiceValidationError(msg)
+    if not await hass.async_add_executor_job(_is_export_allowed, hass, path):
+        msg = f"{path} is a link or outside of the allowed external directories"
+        raise ServiceValidationError(msg)
+    return path
+
+
+def _is_export_allowed(hass: HomeAssistant, path: Path) -> bool:
+    """Return whether an export may be written to path, blocking."""
+    return not path.is_symlink() and hass.config.is_allowed_path(str(path))
@@ -0,0 +1,365 @@
+"""
+Timetable sources for the Muslim Prayer Companion.
+
+Mosque timetables are published for a whole year (or month) at once, so they
+are downloaded once, indexed per day and persisted, instead of being fetched
+again on every refresh.
+
+Each source is an adapter registered in ``SOURCE_ADAPTERS`` under its
+calculation method. It declares how its timetable is published (granularity,
+time to live, supported range, DST behavior) and the coordinator derives the
+batching, caching and prefetching of its requests from that.
+"""
+
+from __future__ import annotations
+
+import calendar
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, timedelta
+from enum import StrEnum
+from typing import Final
+
+import homeassistant.util.dt as dt_util
+import numpy as np
+
+from .timetable import MISSING, parse_minutes
+
+# Name of the custom iqamah API, for its circuit breaker.
+IQAMAH_SOURCE: Final = "iqamah_api"
+ICCI_SOURCE: Final = "ie-icci"
+ICCI_URL: Final = "https://islamireland.ie/api/timetable/"
+# Cells of a mosque timetable: Fajr, Sunrise, Dhuhr, Asr, Maghrib, Isha.
+ICCI_PRAYERS: Final = 6
+# Cell holding Maghrib, used to detect the clock changes of a timetable.
+MAGHRIB_CELL: Final = 4
+# Version of the persisted indexes, older ones are downloaded again.
+INDEX_VERSION: Final = 3
+# Month of prayer times of a WordPress site with the Daily Prayer Time plugin.
+WP_PLUGIN_URL: Final = (
+    "https://{host}.ie/wp-json/dpt/v1/prayertime?filter=month&month={month}&year={year}"
+)
+# Fields of a Daily Prayer Time row, in the order of the ICCI cells.
+WP_PLUGIN_FIELDS: Final = (
+    "fajr_begins",
+    "sunrise",
+    "zuhr_begins",
+    "asr_mithl_1",
+    "maghrib_begins",
+    "isha_begins",
+)
+
+# Conditional JSON request: (url, validators) -> (json, validators), the
+# json being None when not modified and the validators None on failure.
+FetchJson = Callable[
+    [str, dict[str, str | None]],
+    Awaitable[tuple[dict | list | None, dict[str, str | None] | None]],
+]
+
+
+class Granularity(StrEnum):
+    """Period of a timetable served by one request."""
+
+    DAY = "day"
+    MONTH = "month"
+    YEAR = "year"
+
+    def period_start(self, day: date) -> date:
+        """Return the first day of the period holding day."""
+        if self is Granularity.YEAR:
+            return day.replace(month=1, day=1)
+        if self is Granularity.MONTH:
+            return day.replace(day=1)
+        return day
+
+    def period_days(self, start: date) -> int:
+        """Return the number of days of the period starting at start."""
+        if self is Granularity.YEAR:
+            return 366 if calendar.isleap(start.year) else 365
+        if self is Granularity.MONTH:
+            return calendar.monthrange(start.year, start.month)[1]
+        return 1
+
+
+class DstBehavior(StrEnum):
+    """How a timetable follows the clock changes of the time zone."""
+
+    # The times follow the time zone, nothing to correct.
+    ZONE = "zone"
+    # The clock changes may fall in another week than the time zone ones,
+    # the timetable is corrected from the zone transitions.
+    BROKEN_WEEK = "broken_week"
+
+
+def parse_icci_timetable(json_resp: dict, year: int) -> np.ndarray:
+    """
+    Index the ICCI timetable document by day of the year.
+
+    Args:
+        json_resp (dict): ICCI timetable document, ``timetable[month][day]``
+            holding [hour, minute] pairs
+        year (int): Year to index
+
+    Returns:
+        ndarray: Minutes of the day, one row per day of the year
+
+    """
+    days = 366 if calendar.isleap(year) else 365
+    minutes = np.full((days, ICCI_PRAYERS), MISSING, dtype=np.int16)
+    start = date(year, 1, 1)
+    for month, month_days in json_resp["timetable"].items():
+        for day, prayers in month_days.items():
+            try:
+                index = (date(year, int(month), int(day)) - start).days
+            except ValueError:
+                # 29 February outside of leap years.
+                continue
+            minutes[index] = [hour * 60 + minute for hour, minute in prayers[:6]]
+    return minutes
+
+
+def parse_wp_plugin_rows(json_resp: list[dict]) -> dict[str, list[int]]:
+    """
+    Index the rows of the Daily Prayer Time plugin by day.
+
+    Args:
+        json_resp (list): Plugin rows, each with a ``d_date`` (YYYY-MM-DD) and
+            the HH:MM:SS times of ``WP_PLUGIN_FIELDS``
+
+    Returns:
+        dict: Minutes of the day of the six prayers, keyed by ISO date
+
+    """
+    return {
+        row["d_date"][0:10]: [parse_minutes(row[field]) for field in WP_PLUGIN_FIELDS]
+        for row in json_resp
+    }
+
+
+class SourceAdapter:
+    """Base class of the timetable sources."""
+
+    name: str
+    granularity: Granularity = Granularity.DAY
+    # How long a downloaded period is used before it is revalidated.
+    ttl: timedelta = timedelta(days=1)
+    dst: DstBehavior = DstBehavior.ZONE
+
+    def supported_range(self, today: date) -> tuple[date, date]:
+        """Return the first and last days the source serves, its current period."""
+        start = self.granularity.period_start(today)
+        return start, start + timedelta(days=self.granularity.period_days(start) - 1)
+
+    def period_url(self, start: date) -> str:
+        """Return the URL of the period starting at start."""
+        raise NotImplementedError
+
+    def parse(self, json_resp: dict | list, start: date) -> np.ndarray:
+        """Return the (days, 6) minutes of the period starting at start."""
+        raise NotImplementedError
+
+    async def async_fetch(
+        self,
+        fetch_json: FetchJson,
+        start: date,
+        validators: dict[str, str | None],
+    ) -> tuple[np.ndarray | None, dict[str, str | None] | None]:
+        """
+        Download the period starting at start, unless it was not modified.
+
+        Args:
+            fetch_json (FetchJson): Conditional JSON request of the coordinator
+            start (date): First day of the period
+            validators (dict): ETag and Last-Modified of the cached period
+
+        Returns:
+            tuple: Minutes of the period (None if not modified or failed),
+                response validators (None if the request failed)
+
+        """
+        json_resp, validators = await fetch_json(self.period_url(start), validators)
+        if json_resp is None:
+            return None, validators
+        return self.parse(json_resp, start), validators
+
+
+class IcciSource(SourceAdapter):
+    """Annual timetable of the Islamic Cultural Centre of Ireland."""
+
+    name = ICCI_SOURCE
+    granularity = Granularity.YEAR
+    ttl = timedelta(days=7)
+    dst = DstBehavior.BROKEN_WEEK
+
+    def period_url(self, _start: date) -> str:
+        """Return the URL of the timetable, which is always the current year."""
+        return ICCI_URL
+
+    def parse(self, json_resp: dict, start: date) -> np.ndarray:
+        """Index the ICCI timetable document by day of the year."""
+        return parse_icci_timetable(json_resp, start.year)
+
+
+class WpPluginSource(SourceAdapter):
+    """Monthly timetable of a WordPress site with the Daily Prayer Time plugin."""
+
+    granularity = Granularity.MONTH
+    # Published months do not change, fetch each of them once.
+    ttl = timedelta(days=31)
+    dst = DstBehavior.BROKEN_WEEK
+
+    def __init__(self, name: str, host: str) -> None:
+        """Initialize the source of a calculation method and site."""
+        self.name = name
+        self.host = host
+
+    def supported_range(self, today: date) -> tuple[date, date]:
+        """Return the first and last days served, this month and the next."""
+        first, last = super().supported_range(today)
+        # So the prefetch window reaches into the next month at its end.
+        return first, super().supported_range(last + timedelta(days=1))[1]
+
+    def period_url(self, start: date) -> str:
+        """Return the URL of the month starting at start."""
+        return WP_PLUGIN_URL.format(host=self.host, month=start.month, year=start.year)
+
+    def parse(self, json_resp: list[dict], start: date) -> np.ndarray:
+        """Index the rows of the month by day."""
+        days = parse_wp_plugin_rows(json_resp)
+        minutes = np.full(
+            (self.granularity.period_days(start), ICCI_PRAYERS), MISSING, dtype=np.int16
+        )
+        for index in range(len(minutes)):
+            row = days.get((start + timedelta(days=index)).isoformat())
+            if row is not None:
+                minutes[index] = row
+        return minutes
+
+
+SOURCE_ADAPTERS: dict[str, SourceAdapter] = {}
+
+
+def register_source(adapter: SourceAdapter) -> SourceAdapter:
+    """Register a timetable source under its calculation method."""
+    SOURCE_ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+register_source(IcciSource())
+register_source(WpPluginSource("ie-mcnd", "mcnd"))
+register_source(WpPluginSource("ie-hicc", "hicc"))
+
+
+class SourcePeriod:
+    """Downloaded period of a timetable source."""
+
+    __slots__ = ("checked", "etag", "last_modified", "minutes", "start")
+
+    def __init__(
+        self,
+        start: date,
+        minutes: np.ndarray,
+        validators: dict[str, str | None],
+        checked: datetime | None = None,
+    ) -> None:
+        """Initialize the period."""
+        self.start = start
+        self.minutes = minutes
+        self.etag = validators.get("etag")
+        self.last_modified = validators.get("last_modified")
+        self.checked = checked
+
+    @property
+    def validators(self) -> dict[str, str | None]:
+        """Return the validators for a conditional request of the period."""
+        return {"etag": self.etag, "last_modified": self.last_modified}
+
+
+class SourceTimetable:
+    """Per day index of the downloaded periods of a timetable source."""
+
+    __slots__ = ("granularity", "periods")
+
+    def __init__(self, granularity: Granularity) -> None:
+        """Initialize an empty index."""
+        self.granularity = granularity
+        self.periods: dict[date, SourcePeriod] = {}
+
+    def period(self, day: date) -> SourcePeriod | None:
+        """Return the downloaded period holding day."""
+        return self.periods.get(self.granularity.period_start(day))
+
+    def validators(self, day: date) -> dict[str, str | None]:
+        """Return the validators of the period holding day."""
+        period = self.period(day)
+        return period.validators if period else {}
+
+    def needs_refresh(self, day: date, ttl: timedelta) -> bool:
+        """Return whether the period holding day must be (re)validated."""
+        period = self.period(day)
+        return (
+            period is None
+            or period.checked is None
+            or dt_util.utcnow() - period.checked > ttl
+        )
+
+    def update(
+        self,
+        start: date,
+        minutes: np.ndarray | None,
+        validators: dict[str, str | None],
+    ) -> None:
+        """Index a downloaded period, or mark a not modified one as checked."""
+        if minutes is not None:
+            self.periods[start] = SourcePeriod(start, minutes, validators)
+        self.periods[start].checked = dt_util.utcnow()
+        # Periods that ended before yesterday are no longer needed.
+        oldest = dt_util.now().date() - timedelta(days=1)
+        for known in list(self.periods):
+            if known + timedelta(days=len(self.periods[known].minutes)) <= oldest:
+                del self.periods[known]
+
+    def get_day(self, day: date) -> np.ndarray | None:
+        """Return the minutes of the six prayers of a day."""
+        period = self.period(day)
+        if period is None:
+            return None
+        index = (day - period.start).days
+        if index >= len(period.minutes):
+            return None
+        row = period.minutes[index]
+        if (row == MISSING).any():
+            return None
+        return row
+
+    def as_dict(self) -> dict:
+        """Return the index as JSON serializable data."""
+        return {
+            "version": INDEX_VERSION,
+            "periods": [
+                {
+                    "start": period.start.isoformat(),
+                    "minutes": period.minutes.tolist(),
+                    "etag": period.etag,
+                    "last_modified": period.last_modified,
+                    "checked": period.checked.isoformat() if period.checked else None,
+                }
+                for period in self.periods.values()
+            ],
+        }
+
+    def restore(self, data: dict | None) -> None:
+        """Restore the index from data returned by as_dict."""
+        if not data or data.get("version") != INDEX_VERSION:
+            return
+        for period in data.get("periods", []):
+            start = date.fromisoformat(period["start"])
+            self.periods[start] = SourcePeriod(
+                start,
+                np.array(period["minutes"], dtype=np.int16),
+                period,
+                (
+                    dt_util.parse_datetime(period["checked"])
+                    if period["checked"]
+                    else None
+                ),
+            )
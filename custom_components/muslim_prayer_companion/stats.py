@@ -0,0 +1,80 @@
+"""
+Performance counters of the Muslim Prayer Companion timetable sources.
+
+Every request to a source records its latency in a fixed bucket histogram
+and the size of its body, and every lookup of its timetable records whether
+the indexed copy was fresh enough to be served without a request. The
+counters live on the shared engine and are exposed by the diagnostics and
+the diagnostic sensors.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Final
+
+# Upper bounds of the latency histogram buckets, in seconds; the last
+# bucket holds the slower requests.
+LATENCY_BUCKETS: Final = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class SourceStats:
+    """Request and cache counters of a single source."""
+
+    __slots__ = (
+        "bytes",
+        "cache_hits",
+        "cache_misses",
+        "failures",
+        "latency_buckets",
+        "latency_sum",
+        "requests",
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self.requests = 0
+        self.failures = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_request(self, seconds: float, size: int = 0) -> None:
+        """Record a completed request and the size of its body."""
+        self.requests += 1
+        self.bytes += size
+        self.latency_sum += seconds
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def record_failure(self, seconds: float) -> None:
+        """Record a failed request."""
+        self.record_request(seconds)
+        self.failures += 1
+
+    @property
+    def mean_latency(self) -> float | None:
+        """Return the mean latency of the requests in seconds."""
+        return self.latency_sum / self.requests if self.requests else None
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Return the share of lookups served from the indexed timetable."""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def as_dict(self) -> dict[str, any]:
+        """Return the counters, the histogram keyed by bucket upper bound."""
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS]
+        labels.append(f">{LATENCY_BUCKETS[-1]}s")
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "bytes": self.bytes,
+            "mean_latency": self.mean_latency,
+            "latency_histogram": dict(zip(labels, self.latency_buckets, strict=True)),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": self.cache_hit_ratio,
+        }
@@ -0,0 +1,92 @@
+"""
+Persistent timetable cache for the Muslim Prayer Companion.
+
+The last computed or fetched prayer times are saved with Home Assistant's
+``Store`` helper, keyed by location, calculation method and date, so the
+sensors can be restored at startup without waiting for any network call.
+The indexed documents of the timetable sources are saved alongside.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Final
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+STORAGE_VERSION: Final = 1
+STORAGE_KEY: Final = f"{DOMAIN}.timetables"
+# Delay before writing changes, so a refresh touching many days saves once.
+SAVE_DELAY: Final = 10
+# Past days kept in the cache, older ones are dropped when saving.
+KEEP_PAST_DAYS: Final = 1
+# Coordinates are rounded to a grid cell of about 1 km, within which prayer
+# times differ by a few seconds at most.
+GRID_DECIMALS: Final = 2
+
+
+def grid_location(latitude: float, longitude: float) -> tuple[float, float]:
+    """Return the grid cell of a location."""
+    return round(latitude, GRID_DECIMALS), round(longitude, GRID_DECIMALS)
+
+
+def cache_key(latitude: float, longitude: float, method: str) -> str:
+    """Return the cache key of a location and calculation method."""
+    return f"{latitude:.4f},{longitude:.4f},{method}"
+
+
+class TimetableCache:
+    """Per day timetable rows persisted in the Home Assistant storage."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, dict]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._tables: dict[str, dict[str, list[int]]] = {}
+        self._sources: dict[str, dict] = {}
+        self._loaded = False
+
+    async def async_load(self) -> None:
+        """Load the cache from disk, once."""
+        if self._loaded:
+            return
+        data = await self._store.async_load()
+        self._tables = (data or {}).get("timetables", {})
+        self._sources = (data or {}).get("sources", {})
+        self._loaded = True
+
+    def get_day(self, key: str, day: date) -> list[int] | None:
+        """Return the cached timetable row of a day."""
+        return self._tables.get(key, {}).get(day.isoformat())
+
+    @callback
+    def async_set_day(self, key: str, day: date, row: Iterable[int]) -> None:
+        """Cache the timetable row of a day."""
+        self._tables.setdefault(key, {})[day.isoformat()] = list(row)
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def get_source(self, name: str) -> dict | None:
+        """Return the cached document index of a timetable source."""
+        return self._sources.get(name)
+
+    @callback
+    def async_set_source(self, name: str, data: dict) -> None:
+        """Cache the document index of a timetable source."""
+        self._sources[name] = data
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict]:
+        """Return the data to store, without days that are no longer needed."""
+        oldest = (dt_util.now().date() - timedelta(days=KEEP_PAST_DAYS)).isoformat()
+        for key, days in list(self._tables.items()):
+            self._tables[key] = {day: row for day, row in days.items() if day >= oldest}
+            if not self._tables[key]:
+                del self._tables[key]
+        return {"timetables": self._tables, "sources": self._sources}
@@ -0,0 +1,161 @@
+"""
+Array backed prayer timetables for the Muslim Prayer Companion.
+
+A timetable holds one row per day and one column per entry of
+``const.TIMETABLE_PRAYERS``, each cell being the minute of the local day
+(0-1439) or ``MISSING`` when the time does not exist for that day.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import TYPE_CHECKING, Final
+
+import numpy as np
+
+from .const import TIMETABLE_PRAYERS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+MISSING: Final = -1
+COLUMNS: Final = {prayer: index for index, prayer in enumerate(TIMETABLE_PRAYERS)}
+
+
+def format_minutes(minutes: int) -> str:
+    """Format a minute of the day as HH:MM."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_minutes(str_time: str) -> int:
+    """Parse a time in format HH:MM to a minute of the day."""
+    hour, minute = str_time[0:5].split(":")
+    return (int(hour) * 60 + int(minute)) % 1440
+
+
+def times_to_row(times: dict[str, str]) -> list[int]:
+    """Convert HH:MM prayer times of a day to a timetable row."""
+    row = []
+    for prayer in TIMETABLE_PRAYERS:
+        try:
+            row.append(parse_minutes(times[prayer]))
+        except (KeyError, TypeError, ValueError):
+            row.append(MISSING)
+    return row
+
+
+def row_to_times(row: Iterable[int]) -> dict[str, str]:
+    """Convert a timetable row to HH:MM prayer times, skipping missing ones."""
+    return {
+        prayer: format_minutes(int(value))
+        for prayer, value in zip(TIMETABLE_PRAYERS, row, strict=True)
+        if value != MISSING
+    }
+
+
+def minutes_to_datetime(day: date, minutes: int, time_zone: tzinfo) -> datetime:
+    """Build the aware datetime of a minute of a local day."""
+    return datetime.combine(day, time(minutes // 60, minutes % 60), tzinfo=time_zone)
+
+
+class DayTimetable:
+    """Prayer times of a single day, as small ints in ``TIMETABLE_PRAYERS`` order."""
+
+    __slots__ = ("day", "minutes")
+
+    def __init__(self, day: date, minutes: Iterable[int]) -> None:
+        """Initialize the day from the minutes of every prayer."""
+        self.day = day
+        self.minutes = array("h", (int(value) for value in minutes))
+
+    @classmethod
+    def from_times(cls, day: date, times: dict[str, str]) -> DayTimetable:
+        """Build the day from prayer times in format HH:MM."""
+        return cls(day, times_to_row(times))
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether other is the same day with the same prayer times."""
+        if not isinstance(other, DayTimetable):
+            return NotImplemented
+        return self.day == other.day and self.minutes == other.minutes
+
+    def __repr__(self) -> str:
+        """Return the day and its prayer times in format HH:MM."""
+        return f"DayTimetable(day={self.day}, times={self.times()})"
+
+    def __getitem__(self, prayer: str) -> int:
+        """Return the minute of the day of a prayer, or MISSING."""
+        return self.minutes[COLUMNS[prayer]]
+
+    def items(self) -> Iterator[tuple[str, int]]:
+        """Iterate over the prayers that exist on this day and their minutes."""
+        for prayer, value in zip(TIMETABLE_PRAYERS, self.minutes, strict=True):
+            if value != MISSING:
+                yield prayer, value
+
+    def times(self) -> dict[str, str]:
+        """Return the prayer times in format HH:MM."""
+        return row_to_times(self.minutes)
+
+    def datetime(self, prayer: str, time_zone: tzinfo) -> datetime | None:
+        """Return the aware datetime of a prayer."""
+        value = self[prayer]
+        if value == MISSING:
+            return None
+        return minutes_to_datetime(self.day, value, time_zone)
+
+
+class Timetable:
+    """Prayer times of a contiguous range of days."""
+
+    __slots__ = ("minutes", "start")
+
+    def __init__(self, start: date, minutes: np.ndarray) -> None:
+        """Initialize the timetable from a (days, prayers) minute array."""
+        self.start = start
+        self.minutes = np.asarray(minutes, dtype=np.int16)
+
+    def __len__(self) -> int:
+        """Return the number of days in the timetable."""
+        return self.minutes.shape[0]
+
+    def __contains__(self, day: date) -> bool:
+        """Return whether the day is covered by the timetable."""
+        return 0 <= (day - self.start).days < len(self)
+
+    def __repr__(self) -> str:
+        """Return the range of days of the timetable."""
+        return f"Timetable(start={self.start}, days={len(self)})"
+
+    @property
+    def end(self) -> date:
+        """Return the last day covered by the timetable."""
+        return self.start + timedelta(days=len(self) - 1)
+
+    def index(self, day: date) -> int:
+        """Return the row index of a day."""
+        if day not in self:
+            raise KeyError(day)
+        return (day - self.start).days
+
+    def row(self, day: date) -> np.ndarray:
+        """Return the minutes of all prayers of a day."""
+        return self.minutes[self.index(day)]
+
+    def column(self, prayer: str) -> np.ndarray:
+        """Return the minutes of a prayer over all days."""
+        return self.minutes[:, COLUMNS[prayer]]
+
+    def day(self, day: date) -> DayTimetable:
+        """Return the prayer times of a day."""
+        return DayTimetable(day, self.row(day))
+
+    def day_times(self, day: date) -> dict[str, str]:
+        """Return the prayer times of a day in format HH:MM."""
+        return row_to_times(self.row(day))
+
+    def dates(self) -> Iterator[date]:
+        """Iterate over the days covered by the timetable."""
+        for offset in range(len(self)):
+            yield self.start + timedelta(days=offset)
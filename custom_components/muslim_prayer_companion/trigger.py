@@ -0,0 +1,141 @@
+"""
+Automation triggers at the Muslim Prayer Companion prayer and iqamah times.
+
+A trigger fires at a prayer or iqamah time shifted by an offset, e.g. five
+minutes before the Asr iqamah. Every trigger of every automation is a job on
+the boundary heap of its entry, so there is a single armed timer however many
+automations there are, and firing or removing a trigger costs O(log n).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from functools import partial
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from homeassistant.const import CONF_OFFSET, CONF_PLATFORM
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+
+from .const import DOMAIN, EVENT_PRAYERS
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
+    from homeassistant.helpers.typing import ConfigType
+
+    from .coordinator import MuslimPrayerCompanionDataUpdateCoordinator
+
+CONF_CONFIG_ENTRY_ID = "config_entry_id"
+CONF_EVENT = "event"
+CONF_PRAYER = "prayer"
+EVENT_PRAYER = "prayer"
+EVENT_IQAMAH = "iqamah"
+
+TRIGGER_SCHEMA = cv.TRIGGER_BASE_SCHEMA.extend(
+    {
+        vol.Required(CONF_PLATFORM): DOMAIN,
+        vol.Required(CONF_PRAYER): vol.In(EVENT_PRAYERS),
+        vol.Optional(CONF_EVENT, default=EVENT_PRAYER): vol.In(
+            [EVENT_PRAYER, EVENT_IQAMAH]
+        ),
+        vol.Optional(CONF_OFFSET, default=timedelta(0)): cv.time_period,
+        # Every entry when omitted.
+        vol.Optional(CONF_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+
+async def async_attach_trigger(
+    hass: HomeAssistant,
+    config: ConfigType,
+    action: TriggerActionType,
+    trigger_info: TriggerInfo,
+) -> CALLBACK_TYPE:
+    """Listen for a prayer or iqamah time."""
+    trigger = PrayerTrigger(hass, config, action, trigger_info)
+    # Automations may load before any entry: import the engine and numpy in
+    # the executor, like the first setup does.
+    engine = await hass.async_add_import_executor_job(
+        import_module, f"{__package__}.engine"
+    )
+    return engine.async_get_engine(hass).async_register_trigger(trigger)
+
+
+class PrayerTrigger:
+    """Automation trigger at a prayer or iqamah time shifted by an offset."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config: ConfigType,
+        action: TriggerActionType,
+        trigger_info: TriggerInfo,
+    ) -> None:
+        """Initialize the trigger from its validated configuration."""
+        self.hass = hass
+        self.prayer: str = config[CONF_PRAYER]
+        self.event: str = config[CONF_EVENT]
+        self.offset: timedelta = config[CONF_OFFSET]
+        self.entry_id: str | None = config.get(CONF_CONFIG_ENTRY_ID)
+        self._job = HassJob(action, f"{DOMAIN} trigger {self.prayer} {self.event}")
+        self._trigger_data = trigger_info["trigger_data"]
+        # Cancel callback of the job scheduled on each followed entry.
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+
+    def follows(self, coordinator: MuslimPrayerCompanionDataUpdateCoordinator) -> bool:
+        """Return whether the trigger follows the prayer times of an entry."""
+        return self.entry_id in (None, coordinator.config_entry.entry_id)
+
+    @callback
+    def async_schedule(
+        self,
+        coordinator: MuslimPrayerCompanionDataUpdateCoordinator,
+        after: datetime,
+    ) -> None:
+        """Schedule the first firing after a moment on the timer of an entry."""
+        entry_id = coordinator.config_entry.entry_id
+        if unsub := self._unsubs.pop(entry_id, None):
+            unsub()
+        when = coordinator.next_prayer_time(
+            self.prayer, self.offset, after, iqamah=self.event == EVENT_IQAMAH
+        )
+        if when is not None:
+            self._unsubs[entry_id] = coordinator.async_schedule_at(
+                when, partial(self._async_fire, coordinator, when)
+            )
+
+    @callback
+    def _async_fire(
+        self,
+        coordinator: MuslimPrayerCompanionDataUpdateCoordinator,
+        when: datetime,
+        now: datetime,
+    ) -> None:
+        """Run the automation and schedule the next firing."""
+        entry_id = coordinator.config_entry.entry_id
+        self._unsubs.pop(entry_id, None)
+        self.hass.async_run_hass_job(
+            self._job,
+            {
+                "trigger": {
+                    **self._trigger_data,
+                    "platform": DOMAIN,
+                    "prayer": self.prayer,
+                    "event": self.event,
+                    "offset": self.offset,
+                    "config_entry_id": entry_id,
+                    "time": when,
+                    "description": f"{self.prayer} {self.event} {self.offset}",
+                }
+            },
+        )
+        self.async_schedule(coordinator, max(when, now))
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel the firings scheduled on every entry."""
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs.clear()
@@ -0,0 +1,278 @@
+"""
+Benchmarks of the Muslim Prayer Companion refresh pipeline and parsers.
+
+The mosque timetables and the iqamah API are recorded payloads served by a
+local aiohttp stand-in, so the refresh goes through the real HTTP, parsing,
+DST correction and indexing code. Besides the pytest-benchmark timings, every
+benchmark reports its p99 latency, and the refresh benchmarks the refreshes
+per second and the memory allocated by one refresh.
+
+Run them alone with ``pytest tests/test_benchmarks.py --benchmark-only``.
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import homeassistant.util.dt as dt_util
+import numpy as np
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+from test_helpers import create_fake_config_entry, create_fake_hass
+
+from custom_components.muslim_prayer_companion import (
+    calculation,
+    const,
+    coordinator,
+    sources,
+)
+
+pytest.importorskip("pytest_benchmark")
+
+FIXTURES = Path(__file__).parent / "fixtures"
+ROOT = Path(__file__).parent.parent
+# Local time frozen within the recorded payloads.
+JANUARY_2024 = dt_util.as_utc(
+    dt_util.parse_datetime("2024-01-10 12:00:00").replace(
+        tzinfo=ZoneInfo("Europe/Dublin")
+    )
+)
+ICCI_STAND_IN = "bench-icci"
+DPT_STAND_IN = "bench-dpt"
+
+
+def load_fixture(name):
+    """Return a recorded payload."""
+    return json.loads((FIXTURES / name).read_text())
+
+
+class StandInIcciSource(sources.IcciSource):
+    """ICCI timetable served by the stand-in."""
+
+    name = ICCI_STAND_IN
+
+    def __init__(self, url):
+        self.url = url
+
+    def period_url(self, start):
+        return self.url
+
+
+class StandInWpPluginSource(sources.WpPluginSource):
+    """Daily Prayer Time plugin month served by the stand-in."""
+
+    def __init__(self, url):
+        super().__init__(DPT_STAND_IN, "stand-in")
+        self.url = url
+
+    def period_url(self, start):
+        return self.url
+
+
+def record_stats(benchmark, run_once=None):
+    """Add the p99 latency, and the refresh rate and allocations, to the report."""
+    if benchmark.stats is None:
+        # Benchmarks are disabled, e.g. under xdist.
+        return
+    rounds = np.asarray(benchmark.stats.stats.data)
+    benchmark.extra_info["p99_ms"] = float(np.percentile(rounds, 99) * 1000)
+    if run_once is not None:
+        benchmark.extra_info["refreshes_per_second"] = float(1 / rounds.mean())
+        tracemalloc.start()
+        try:
+            run_once()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["allocated_kib_per_refresh"] = peak / 1024
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Serve the recorded payloads and register the stand-in sources."""
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    monkeypatch.setattr(dt_util, "DEFAULT_TIME_ZONE", ZoneInfo("Europe/Dublin"))
+    payloads = {
+        "/icci": load_fixture("icci_timetable_2024.json"),
+        "/dpt": load_fixture("dpt_plugin_2024_01.json"),
+        "/iqamah": load_fixture("iqamah_api.json"),
+    }
+
+    async def serve(request):
+        return web.json_response(
+            payloads[request.path], headers={"ETag": f'"{request.path}"'}
+        )
+
+    app = web.Application()
+    app.router.add_get("/{name}", serve)
+    server = TestServer(app)
+    with asyncio.Runner() as runner:
+        runner.run(server.start_server())
+        session = runner.run(_async_session())
+        monkeypatch.setattr(
+            coordinator.MuslimPrayerCompanionDataUpdateCoordinator,
+            "session",
+            property(lambda self: session),
+        )
+        base_url = str(server.make_url(""))
+        sources.register_source(StandInIcciSource(f"{base_url}/icci"))
+        sources.register_source(StandInWpPluginSource(f"{base_url}/dpt"))
+        try:
+            yield runner, base_url
+        finally:
+            sources.SOURCE_ADAPTERS.pop(ICCI_STAND_IN)
+            sources.SOURCE_ADAPTERS.pop(DPT_STAND_IN)
+            runner.run(session.close())
+            runner.run(server.close())
+
+
+async def _async_session():
+    """Create the client session within the running loop."""
+    return ClientSession()
+
+
+def create_coordinator(method, base_url):
+    """Return a coordinator of method with the iqamah API of the stand-in."""
+    coord = coordinator.MuslimPrayerCompanionDataUpdateCoordinator(create_fake_hass())
+    coord.config_entry = create_fake_config_entry(
+        options={
+            const.CONF_CALC_METHOD: method,
+            const.CONF_IQAMAH_METHOD: "api",
+            "custom_iqamah_api": f"{base_url}/iqamah",
+        }
+    )
+    # Refreshes are a day apart, none shares the results of the previous one.
+    coord.engine.coalescer.max_age = 0
+    return coord
+
+
+@pytest.mark.parametrize("method", [ICCI_STAND_IN, DPT_STAND_IN, "isna"])
+def test_benchmark_refresh(benchmark, stand_in, method):
+    """Benchmark a refresh served from the downloaded or computed timetable."""
+    runner, base_url = stand_in
+    coord = create_coordinator(method, base_url)
+    runner.run(coord._async_update_data())
+
+    def refresh():
+        return runner.run(coord._async_update_data())
+
+    data = benchmark(refresh)
+    assert data["Fajr"] is not None
+    assert "iqamah_Fajr" in data
+    record_stats(benchmark, refresh)
+
+
+@pytest.mark.parametrize("method", [ICCI_STAND_IN, DPT_STAND_IN])
+def test_benchmark_refresh_download(benchmark, stand_in, method):
+    """Benchmark a refresh downloading, correcting and indexing the timetable."""
+    runner, base_url = stand_in
+    coord = create_coordinator(method, base_url)
+
+    def refresh():
+        coord.engine.source_tables.clear()
+        coord.cache._sources.clear()
+        return runner.run(coord._async_update_data())
+
+    data = benchmark(refresh)
+    assert coord.engine.source_tables[method].get_day(JANUARY_2024.date()) is not None
+    assert data["Fajr"] is not None
+    record_stats(benchmark, refresh)
+
+
+def test_benchmark_compute_timetable(benchmark):
+    """Benchmark the vectorized calculation of a year of prayer times."""
+    timetable = benchmark(
+        calculation.compute_timetable,
+        53.35,
+        -6.26,
+        "isna",
+        JANUARY_2024.date().replace(day=1),
+        366,
+        ZoneInfo("Europe/Dublin"),
+    )
+    assert len(timetable) == 366
+    record_stats(benchmark)
+
+
+@pytest.mark.parametrize("method", [ICCI_STAND_IN, "isna"])
+def test_benchmark_get_cached_timetable(benchmark, stand_in, method):
+    """
+    Benchmark a year of prayer times served from the cached timetables, and
+    the formatting of a day of it.
+    """
+    runner, base_url = stand_in
+    coord = create_coordinator(method, base_url)
+    runner.run(coord._async_update_data())
+    today = JANUARY_2024.date()
+
+    def year_of_times():
+        return coord.get_cached_timetable(today, 366).day_times(today)
+
+    assert benchmark(year_of_times)["Fajr"]
+    record_stats(benchmark)
+
+
+@pytest.mark.parametrize("method", [ICCI_STAND_IN, "isna"])
+def test_benchmark_build_data(benchmark, stand_in, method):
+    """Benchmark the sensor data built at each prayer boundary."""
+    runner, base_url = stand_in
+    coord = create_coordinator(method, base_url)
+    runner.run(coord._async_update_data())
+    data = benchmark(coord._build_data)
+    assert data["next_prayer_name"]
+    record_stats(benchmark)
+
+
+def test_benchmark_parse_wp_plugin(benchmark):
+    """Benchmark the parsing of a recorded Daily Prayer Time plugin month."""
+    rows = load_fixture("dpt_plugin_2024_01.json")
+    adapter = sources.SOURCE_ADAPTERS["ie-mcnd"]
+    start = JANUARY_2024.date().replace(day=1)
+    minutes = benchmark(adapter.parse, rows, start)
+    assert minutes.shape == (31, sources.ICCI_PRAYERS)
+    record_stats(benchmark)
+
+
+def test_benchmark_parse_icci_timetable(benchmark):
+    """Benchmark the parsing of the recorded ICCI annual timetable."""
+    document = load_fixture("icci_timetable_2024.json")
+    minutes = benchmark(sources.parse_icci_timetable, document, 2024)
+    assert minutes.shape == (366, sources.ICCI_PRAYERS)
+    record_stats(benchmark)
+
+
+@pytest.mark.parametrize("module", ["", ".config_flow", ".coordinator"])
+def test_benchmark_import_time(benchmark, module):
+    """
+    Benchmark the import of the integration in a fresh interpreter, after the
+    Home Assistant modules it shares with every integration.
+    """
+    code = (
+        "import time, homeassistant.helpers.update_coordinator, "
+        "homeassistant.helpers.aiohttp_client, homeassistant.helpers.storage, "
+        "homeassistant.helpers.config_validation\n"
+        "started = time.perf_counter()\n"
+        f"import custom_components.muslim_prayer_companion{module}\n"
+        "print(time.perf_counter() - started)"
+    )
+
+    import_times = []
+
+    def import_integration():
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        import_times.append(float(result.stdout))
+
+    # The rounds time the whole interpreter, the import alone is reported.
+    benchmark.pedantic(import_integration, rounds=3)
+    benchmark.extra_info["import_ms"] = float(np.median(import_times) * 1000)
@@ -4,7 +4,7 @@ This module provides utility functions and fixtures to create fake Home Assistan
 objects, dummy config entries, and sample prayer/hijri data for testing.
 """
 
-from datetime import date, datetime, timedelta
+from datetime import timedelta
 from unittest.mock import MagicMock
 
 
@@ -14,12 +14,17 @@ def create_fake_hass():
     # Provide fake latitude and longitude
     hass.config.latitude = 51.5074  # e.g. London latitude
     hass.config.longitude = -0.1278  # e.g. London longitude
+    hass.data = {}
 
     # Simulate async_add_executor_job by simply calling the function directly.
     async def fake_add_executor_job(func, *args, **kwargs):
         return func(*args, **kwargs)
 
     hass.async_add_executor_job = fake_add_executor_job
+    hass.async_add_import_executor_job = fake_add_executor_job
+    # Delayed storage writes are scheduled on the loop, never run.
+    hass.loop.time.return_value = 0.0
+    hass.loop.call_at.return_value.when.return_value = 0.0
     return hass
 
 
@@ -32,6 +37,7 @@ def create_fake_config_entry(
     entry = MagicMock()
     entry.domain = domain
     entry.options = options
+    entry.data = {}
     entry.entry_id = entry_id
     return entry
 
@@ -63,3 +69,34 @@ def dummy_hijri_date():
         "hijri_date_readable": "10-Ramadan-1444",
         "hijri_day_month_readable": "10-Ramadan",
     }
+
+
+def dummy_wp_plugin_month(month):
+    """Return dummy Daily Prayer Time plugin rows for a whole month."""
+    rows = []
+    day = month.replace(day=1)
+    while day.month == month.month:
+        rows.append(
+            {
+                "d_date": day.isoformat(),
+                "fajr_begins": "06:10:00",
+                "sunrise": "07:50:00",
+                "zuhr_begins": "13:05:00",
+                "asr_mithl_1": "15:40:00",
+                "maghrib_begins": "18:20:00",
+                "isha_begins": "19:55:00",
+            }
+        )
+        day += timedelta(days=1)
+    return rows
+
+
+def dummy_icci_timetable():
+    """Return a dummy ICCI annual timetable document (same times every day)."""
+    prayers = [[6, 10], [7, 50], [13, 5], [15, 40], [18, 20], [19, 55]]
+    return {
+        "timetable": {
+            str(month): {str(day): prayers for day in range(1, 32)}
+            for month in range(1, 13)
+        }
+    }
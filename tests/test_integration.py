@@ -3,25 +3,63 @@ Test cases for the Muslim Prayer Companion integration.
 These tests cover coordinator updates, sensor state conversion, and the config flow.
 """
 
+import asyncio
+import subprocess
+import sys
 from datetime import date, datetime, timedelta
+from functools import partial
+from itertools import pairwise
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
 
 import homeassistant.util.dt as dt_util
+import numpy as np
 import pytest
+import voluptuous as vol
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
+from homeassistant.core import Context, ServiceCall
+from homeassistant.exceptions import ServiceValidationError, Unauthorized
 from homeassistant.util.dt import as_utc
 from test_helpers import (
     create_fake_config_entry,
     create_fake_hass,
     dummy_hijri_date,
+    dummy_icci_timetable,
     dummy_prayer_times,
+    dummy_wp_plugin_month,
 )
 
 # Import components from the integration.
+import custom_components.muslim_prayer_companion as integration
 from custom_components.muslim_prayer_companion import (
+    bulk,
+    calculation,
+    calendar,
+    coalesce,
     config_flow,
     const,
     coordinator,
+    diagnostics,
+    dst,
+    hijri,
     sensor,
+    services,
+    sources,
+    stats,
+    trigger,
 )
+from custom_components.muslim_prayer_companion.const import EVENT_PRAYERS
+from custom_components.muslim_prayer_companion.timetable import (
+    MISSING,
+    DayTimetable,
+    parse_minutes,
+    times_to_row,
+)
+
+# Local time frozen by the tests of the 2024 ICCI timetable.
+JANUARY_2024 = datetime(2024, 1, 10, 12, tzinfo=dt_util.UTC)
 
 
 @pytest.fixture
@@ -48,7 +86,10 @@ def coordinator_instance(fake_hass, fake_config_entry):
     coord.config_entry = fake_config_entry
 
     # Monkeypatch methods to return dummy data.
-    coord.get_new_prayer_times = lambda: dummy_prayer_times()
+    async def fake_fetch_prayer_times(calc_method, target_date):
+        return DayTimetable.from_times(target_date, dummy_prayer_times())
+
+    coord._fetch_prayer_times = fake_fetch_prayer_times
     coord.get_hijri_date = lambda: dummy_hijri_date()
     return coord
 
@@ -70,6 +111,764 @@ async def test_coordinator_update(coordinator_instance):
     assert "next_prayer_name" in data
 
 
+@pytest.mark.asyncio
+async def test_coordinator_restores_from_cache(coordinator_instance):
+    """
+    Test that after one refresh the coordinator can publish today's prayer
+    times from the timetable cache without fetching anything.
+    """
+    await coordinator_instance._async_update_data()
+    coordinator_instance.cache._loaded = True
+
+    async def fail(*args):
+        raise AssertionError("restore must not fetch prayer times")
+
+    coordinator_instance._fetch_prayer_times = fail
+    assert await coordinator_instance.async_restore()
+    assert coordinator_instance.data["Fajr"].strftime("%M") == "00"
+    assert "hijri_date" in coordinator_instance.data
+
+
+def test_cache_prunes_past_days_in_local_time(coordinator_instance, monkeypatch):
+    """
+    Test that the cache keeps the days from yesterday in the Home Assistant
+    time zone, not in the time zone of the host.
+    """
+    today = date(2024, 1, 10)
+    monkeypatch.setattr(dt_util, "now", lambda: datetime(2024, 1, 10, 0, 30))
+    cache = coordinator_instance.cache
+    for offset in range(-3, 2):
+        cache.async_set_day("key", today + timedelta(days=offset), [0])
+    assert sorted(cache._data_to_save()["timetables"]["key"]) == [
+        "2024-01-09",
+        "2024-01-10",
+        "2024-01-11",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_boundary_scheduler_recomputes_without_fetching(coordinator_instance):
+    """
+    Test that a single timer is armed for the nearest prayer or iqamah time and
+    that reaching it recomputes the derived state without fetching.
+    """
+    data = await coordinator_instance._async_update_data()
+    boundaries = [value for value in data.values() if isinstance(value, datetime)]
+    assert coordinator_instance.update_interval is None
+    assert coordinator_instance._scheduler.next_boundary == min(boundaries)
+
+    async def fail(*args):
+        raise AssertionError("boundaries must not fetch prayer times")
+
+    coordinator_instance._fetch_prayer_times = fail
+    coordinator_instance._async_boundary_reached(dt_util.utcnow())
+    assert coordinator_instance.data["next_prayer_name"] == data["next_prayer_name"]
+
+
+@pytest.mark.asyncio
+async def test_triggers_share_the_boundary_timer(
+    fake_hass, coordinator_instance, monkeypatch
+):
+    """
+    Test that automation triggers are jobs on the boundary heap of their entry,
+    fire at the shifted prayer or iqamah time and schedule their next firing.
+    """
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    monkeypatch.setattr(dt_util, "utcnow", lambda: JANUARY_2024)
+    await coordinator_instance._async_update_data()
+    fake_hass.data[const.DOMAIN] = {"test123": coordinator_instance}
+    fake_hass.async_run_hass_job = lambda job, *args: job.target(*args)
+    fired = []
+    configs = [
+        {"prayer": "Asr", "event": "iqamah", "offset": "-00:05:00"},
+        {"prayer": "Fajr", "offset": "00:10:00"},
+        {"prayer": "Isha", "config_entry_id": "other"},
+    ]
+    removes = [
+        await trigger.async_attach_trigger(
+            fake_hass,
+            trigger.TRIGGER_SCHEMA({"platform": const.DOMAIN, **config}),
+            lambda variables, context=None: fired.append(variables["trigger"]),
+            {"trigger_data": {"id": str(index)}},
+        )
+        for index, config in enumerate(configs)
+    ]
+    scheduler = coordinator_instance._scheduler
+    # The trigger of another entry is not scheduled here.
+    assert scheduler.jobs == 2
+
+    asr_iqamah = JANUARY_2024.replace(hour=15, minute=40)
+    scheduler._async_boundary_reached(asr_iqamah)
+    assert [(data["id"], data["time"]) for data in fired] == [("0", asr_iqamah)]
+    # Rescheduled for the next day.
+    assert scheduler.jobs == 2
+    tomorrow_fajr = JANUARY_2024.replace(day=11, hour=5, minute=10)
+    assert scheduler.next_boundary <= tomorrow_fajr
+
+    for remove in removes:
+        remove()
+    assert scheduler.jobs == 0
+    assert not coordinator_instance.engine.triggers
+
+
+@pytest.mark.asyncio
+async def test_rollover_advances_within_window(coordinator_instance, monkeypatch):
+    """
+    Test that the refresh prefetches a whole window, that passed prayers use
+    tomorrow's times and that the midnight rollover does not fetch anything.
+    """
+    today = dt_util.now().date()
+    tomorrow = today + timedelta(days=1)
+
+    async def fake_fetch_prayer_times(calc_method, target_date):
+        prayer_times = dummy_prayer_times()
+        if target_date != today:
+            prayer_times["Fajr"] = "04:58"
+        return DayTimetable.from_times(target_date, prayer_times)
+
+    coordinator_instance._fetch_prayer_times = fake_fetch_prayer_times
+    noon = dt_util.as_local(datetime.combine(today, datetime.min.time())).replace(
+        hour=12
+    )
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: noon)
+    data = await coordinator_instance._async_update_data()
+    assert len(coordinator_instance._window) == coordinator.PREFETCH_DAYS
+    assert dt_util.as_local(data["Fajr"]).date() == tomorrow
+    assert dt_util.as_local(data["Fajr"]).strftime("%H:%M") == "04:58"
+
+    async def fail(*args):
+        raise AssertionError("the rollover must not fetch prayer times")
+
+    coordinator_instance._fetch_prayer_times = fail
+    after_midnight = noon + timedelta(hours=12, minutes=1)
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: after_midnight)
+    coordinator_instance._async_rollover(after_midnight)
+    assert dt_util.as_local(coordinator_instance.data["Fajr"]).date() == tomorrow
+    # The refill is left to the daily bulk refresh of all the entries.
+    assert coordinator_instance in coordinator_instance.engine._refill_pending
+
+
+@pytest.mark.asyncio
+async def test_slow_mosque_source_is_raced(coordinator_instance):
+    """
+    Test that a mosque timetable missing the source deadline is replaced by
+    the calculation, then swapped in silently once it arrives.
+    """
+    coordinator_instance.config_entry.options[const.CONF_CALC_METHOD] = "ie-mcnd"
+    coordinator_instance.config_entry.options[const.CONF_SOURCE_DEADLINE] = 0.05
+    arrived = asyncio.Event()
+
+    async def slow_fetch_prayer_times(calc_method, target_date):
+        await asyncio.sleep(0.2)
+        arrived.set()
+        return DayTimetable.from_times(target_date, dummy_prayer_times())
+
+    coordinator_instance._fetch_prayer_times = slow_fetch_prayer_times
+    today = dt_util.now().date()
+    reference = coordinator_instance._get_reference_times(today)
+    await asyncio.wait_for(coordinator_instance.async_refresh(), 0.15)
+    assert coordinator_instance._window.row(today).tolist() == list(reference.minutes)
+
+    await arrived.wait()
+    await asyncio.sleep(0.01)
+    mosque = DayTimetable.from_times(today, dummy_prayer_times())
+    assert coordinator_instance._window.row(today).tolist() == list(mosque.minutes)
+    assert dt_util.as_local(coordinator_instance.data["Sunrise"]).strftime("%M") == "30"
+
+
+def test_standard_method_is_calculated_locally(coordinator_instance):
+    """
+    Test that standard methods are computed offline and honor the configured
+    calculation method instead of always using ISNA.
+    """
+    target = date(2024, 3, 15)
+    # London (GMT on that day), as given by the PrayTimes algorithm used by
+    # aladhan.com for the same method.
+    reference = {
+        "isna": ("04:42", "06:14", "12:09", "15:21", "18:06", "19:38", "00:10"),
+        "mwl": ("04:21", "06:14", "12:09", "15:21", "18:06", "19:52", "00:10"),
+    }
+    prayers = ("Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha", "Midnight")
+    for method, times in reference.items():
+        coordinator_instance.config_entry.options[const.CONF_CALC_METHOD] = method
+        day = coordinator_instance._get_prayer_times_standard(target)
+        assert [day[prayer] for prayer in prayers] == [
+            parse_minutes(time) for time in times
+        ]
+    # Dublin, the same day and method.
+    dublin = calculation.compute_prayer_times(
+        53.3498, -6.2603, "mwl", target, dt_util.get_time_zone("Europe/Dublin")
+    )
+    assert [dublin[prayer] for prayer in prayers] == [
+        "04:41",
+        "06:39",
+        "12:34",
+        "15:43",
+        "18:30",
+        "20:21",
+        "00:34",
+    ]
+
+
+def test_entries_share_the_engine(fake_hass, coordinator_instance):
+    """
+    Test that a second entry in the same grid cell reuses the engine of the
+    first one: the timetable is computed once, and a distant entry gets its own.
+    """
+    target = date(2024, 3, 15)
+    table = coordinator_instance.get_calculated_timetable("mwl", target)
+    nearby = coordinator.MuslimPrayerCompanionDataUpdateCoordinator(fake_hass)
+    nearby.config_entry = create_fake_config_entry(entry_id="nearby")
+    nearby.config_entry.data = {
+        CONF_LATITUDE: fake_hass.config.latitude + 0.001,
+        CONF_LONGITUDE: fake_hass.config.longitude,
+    }
+    assert nearby.engine is coordinator_instance.engine
+    assert nearby.cache_key == coordinator_instance.cache_key
+    assert nearby.get_calculated_timetable("mwl", target) is table
+    nearby.config_entry.data = {CONF_LATITUDE: 53.35, CONF_LONGITUDE: -6.26}
+    assert nearby.get_calculated_timetable("mwl", target) is not table
+
+
+@pytest.mark.asyncio
+async def test_calendar_events_from_cached_timetable(
+    fake_hass, coordinator_instance, monkeypatch
+):
+    """
+    Test that the calendar answers a range from the window and, beyond it,
+    from the calculated timetable, without fetching anything.
+    """
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    await coordinator_instance._async_update_data()
+    fetch = AsyncMock(side_effect=AssertionError("fetched"))
+    coordinator_instance._fetch_prayer_times = fetch
+    entity = calendar.MuslimPrayerCompanionCalendar(coordinator_instance)
+    start = JANUARY_2024.replace(hour=0)
+
+    events = await entity.async_get_events(fake_hass, start, start + timedelta(days=14))
+    assert len(events) == 14 * len(EVENT_PRAYERS)
+    assert [event.summary for event in events[:5]] == list(EVENT_PRAYERS)
+    # Within the window: the fetched times, lasting until the iqamah offset.
+    assert events[0].start == start.replace(hour=5)
+    assert events[0].end == start.replace(hour=5, minute=20)
+    assert events[0].description == "Iqamah at 05:20"
+    # Beyond the window: the ISNA fallback of the mosque timetable.
+    last_day = (start + timedelta(days=13)).date()
+    reference = coordinator_instance._get_reference_times(last_day)
+    assert events[-5].start == reference.datetime("Fajr", dt_util.UTC)
+    # Dhuhr starts at noon, it is in progress.
+    assert entity.event.summary == "Dhuhr"
+    fetch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_timetable_service(fake_hass, coordinator_instance, tmp_path):
+    """
+    Test that the get_timetable service returns years of prayer times from the
+    calculation and streams them to CSV and iCalendar files under the config.
+    """
+    fake_hass.data[const.DOMAIN] = {"test123": coordinator_instance}
+    fake_hass.config.config_dir = str(tmp_path)
+    fake_hass.config.path = partial(Path, tmp_path)
+    # Only www is allowed by default.
+    fake_hass.config.is_allowed_path = lambda path: Path(path).is_relative_to(
+        tmp_path / "www"
+    )
+    services.async_setup_services(fake_hass)
+    handler = fake_hass.services.async_register.call_args.args[2]
+    coordinator_instance._fetch_prayer_times = AsyncMock(side_effect=AssertionError)
+
+    async def call(context=None, **data):
+        data = services.GET_TIMETABLE_SCHEMA(
+            {"start_date": "2024-01-01", "end_date": "2025-12-31", **data}
+        )
+        return await handler(
+            ServiceCall(const.DOMAIN, const.SERVICE_GET_TIMETABLE, data, context, True)
+        )
+
+    response = await call(method="isna")
+    assert len(response["days"]) == 731
+    assert response["days"][0]["date"] == "2024-01-01"
+    last_day = coordinator_instance.get_calculated_timetable("isna", date(2025, 12, 31))
+    assert response["days"][-1] == {
+        "date": "2025-12-31",
+        **last_day.day_times(date(2025, 12, 31)),
+    }
+
+    export_dir = tmp_path / "www" / const.DOMAIN
+    response = await call(method="isna", format="csv", filename="timetable.csv")
+    lines = (export_dir / "timetable.csv").read_text().splitlines()
+    assert response["days"] == len(lines) - 1 == 731
+    assert lines[1].startswith("2024-01-01,")
+
+    await call(format="ical", filename="timetable.ics")
+    ical = (export_dir / "timetable.ics").read_text()
+    assert ical.count("BEGIN:VEVENT") == 731 * len(EVENT_PRAYERS)
+    assert ical.endswith("END:VCALENDAR\n")
+
+    # Only exports of the export directory can be written.
+    (tmp_path / "configuration.yaml").write_text("homeassistant:\n")
+    (export_dir / "secrets.csv").symlink_to(tmp_path / "configuration.yaml")
+    for filename in (
+        "../../configuration.yaml",
+        "../../outside.csv",
+        "timetable.ics",
+        "secrets.csv",
+    ):
+        with pytest.raises(ServiceValidationError):
+            await call(format="csv", filename=filename)
+    assert (tmp_path / "configuration.yaml").read_text() == "homeassistant:\n"
+    fake_hass.config.is_allowed_path = lambda path: False
+    with pytest.raises(ServiceValidationError):
+        await call(format="csv", filename="timetable.csv")
+    with pytest.raises(ServiceValidationError):
+        await call(end_date="2023-12-31")
+
+    # The service is reserved to administrators.
+    fake_hass.auth.async_get_user = AsyncMock(return_value=MagicMock(is_admin=False))
+    with pytest.raises(Unauthorized):
+        await call(context=Context(user_id="user"))
+
+
+def test_compute_timetable_matches_daily_calculation():
+    """
+    Test that the vectorized timetable gives the same times as computing each
+    day on its own, and that it is stored as compact minutes of the day.
+    """
+    tz = dt_util.get_time_zone("Europe/Dublin")
+    start = date(2024, 1, 1)
+    table = calculation.compute_timetable(53.35, -6.26, "mwl", start, 366, tz)
+    assert len(table) == 366
+    assert table.minutes.dtype.itemsize == 2
+    assert table.end == date(2024, 12, 31)
+    # Scattered days, with both clock changes of 2024.
+    days = [
+        date(2024, 1, 1),
+        date(2024, 3, 31),
+        date(2024, 6, 21),
+        date(2024, 10, 27),
+        date(2024, 12, 31),
+    ]
+    expected = np.array(
+        [
+            times_to_row(calculation.compute_prayer_times(53.35, -6.26, "mwl", day, tz))
+            for day in days
+        ],
+        dtype=np.int16,
+    )
+    rows = table.minutes[[(day - start).days for day in days]]
+    np.testing.assert_array_equal(rows, expected)
+    assert date(2025, 1, 1) not in table
+
+
+@pytest.mark.asyncio
+async def test_icci_timetable_downloaded_once(coordinator_instance, monkeypatch):
+    """
+    Test that the annual ICCI timetable is downloaded once, indexed per day,
+    and served from the index for the following refreshes.
+    """
+    calls = []
+
+    async def fake_fetch(session, url, validators, stats=None):
+        calls.append(validators)
+        return dummy_icci_timetable(), {"etag": '"v1"', "last_modified": None}
+
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fake_fetch)
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    icci = sources.SOURCE_ADAPTERS["ie-icci"]
+    first = await coordinator_instance._get_source_prayer_times(icci, date(2024, 1, 10))
+    second = await coordinator_instance._get_source_prayer_times(
+        icci, date(2024, 1, 11)
+    )
+    # Outside of the supported range, not fetched.
+    assert not await coordinator_instance._get_source_prayer_times(
+        icci, date(2025, 1, 1)
+    )
+    assert len(calls) == 1
+    assert first["Fajr"] == second["Fajr"]
+    assert first["Fajr"] % 60 == 10 and first["Isha"] % 60 == 55
+    # 29 February exists in the index of a leap year only.
+    table = coordinator_instance.engine.source_tables["ie-icci"]
+    assert table.get_day(date(2024, 2, 29)) is not None
+    assert len(table.period(date(2024, 1, 1)).minutes) == 366
+
+
+@pytest.mark.asyncio
+async def test_iqamah_api_schedule_cached_per_day(coordinator_instance, monkeypatch):
+    """
+    Test that a date ranged iqamah schedule is cached per day, revalidated
+    once its TTL has passed, and gives the iqamah times of the whole window.
+    """
+    week = {"Fajr": "05:20", "Dhuhr": "12:10", "Asr": "15:40", "Maghrib": "18:05"}
+    payload = [
+        {"start": "2024-01-08", "end": "2024-01-14", **week, "Isha": "19:45"},
+        {"start": "2024-01-15", "end": "2024-01-21", **week, "Isha": "19:40"},
+    ]
+    calls = []
+
+    async def fake_fetch(session, url, validators, stats=None):
+        calls.append(validators)
+        if validators.get("etag") == '"v1"':
+            return None, validators
+        return payload, {"etag": '"v1"', "last_modified": None}
+
+    now = [JANUARY_2024]
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fake_fetch)
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: now[0])
+    monkeypatch.setattr(dt_util, "utcnow", lambda: now[0])
+    coordinator_instance.config_entry.options.update(
+        {const.CONF_IQAMAH_METHOD: "api", "custom_iqamah_api": "http://iqamah"}
+    )
+
+    data = await coordinator_instance._async_update_data()
+    # Fajr has passed, the iqamah of tomorrow is served.
+    assert data["iqamah_Fajr"] == JANUARY_2024.replace(day=11, hour=5, minute=20)
+    assert data["iqamah_Dhuhr"] == JANUARY_2024.replace(minute=10)
+    # Days of the next week of the window end at their own Isha iqamah.
+    events = coordinator_instance.event_index.between(
+        JANUARY_2024.replace(day=14), JANUARY_2024.replace(day=16)
+    )
+    isha = [event for event in events if event.prayer == "Isha"]
+    assert [event.end.minute for event in isha] == [45, 40]
+    assert all(event.iqamah for event in events)
+
+    # Within the TTL, served from the cache.
+    now[0] = JANUARY_2024 + timedelta(days=3)
+    await coordinator_instance._async_update_data()
+    assert len(calls) == 1
+    # Past the TTL, a conditional request revalidates the cached schedule.
+    now[0] = JANUARY_2024 + timedelta(days=8)
+    data = await coordinator_instance._async_update_data()
+    assert calls[1] == {"etag": '"v1"', "last_modified": None}
+    assert data["iqamah_Isha"] == (JANUARY_2024 + timedelta(days=8)).replace(
+        hour=19, minute=40
+    )
+
+
+def test_dst_correction_fixes_broken_week():
+    """
+    Test that a timetable switching its clocks a week after the time zone is
+    corrected for that week only, from the zone transitions alone.
+    """
+    time_zone = dt_util.get_time_zone("Europe/Dublin")
+    start = date(2024, 1, 1)
+    days = 366
+    offsets = dst.utc_offset_minutes(start, days, time_zone)
+    expected = [
+        datetime.combine(start + timedelta(days=day), datetime.min.time(), time_zone)
+        .replace(hour=12)
+        .utcoffset()
+        .total_seconds()
+        // 60
+        for day in range(days)
+    ]
+    assert offsets.tolist() == expected
+
+    # Summer time from 31 March (day 90) to 27 October (day 300), one week
+    # late in the timetable.
+    maghrib = np.array([1000 + day // 3 for day in range(days)], dtype=np.int16)
+    maghrib[97:307] += 60
+    maghrib[10] = MISSING
+    correction = dst.dst_correction(start, maghrib, time_zone)
+    assert set(np.flatnonzero(correction == 60)) == set(range(90, 97))
+    assert set(np.flatnonzero(correction == -60)) == set(range(300, 307))
+    assert np.count_nonzero(correction) == 14
+
+
+@pytest.mark.asyncio
+async def test_failing_source_backs_off(coordinator_instance, monkeypatch):
+    """
+    Test that a failing source is not queried again before its backoff has
+    passed, that the data is marked stale meanwhile and that a success
+    closes the breaker.
+    """
+    calls = []
+
+    async def failing_fetch(session, url, validators, stats=None):
+        calls.append(url)
+        return None, None
+
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", failing_fetch)
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    # Share nothing between the requests, only the breaker may skip them.
+    coordinator_instance._coalescer.max_age = 0
+    icci = sources.SOURCE_ADAPTERS["ie-icci"]
+    for day in (10, 11):
+        assert not await coordinator_instance._get_source_prayer_times(
+            icci, date(2024, 1, day)
+        )
+    assert len(calls) == 1
+    assert coordinator_instance.stale
+    breaker = coordinator_instance.engine.breakers[sources.ICCI_SOURCE]
+    assert breaker.retry_at > dt_util.utcnow()
+    assert coordinator_instance._unsub_refill is not None
+
+    async def fetch(session, url, validators, stats=None):
+        return dummy_icci_timetable(), {"etag": None, "last_modified": None}
+
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fetch)
+    breaker.retry_at = dt_util.utcnow()
+    assert await coordinator_instance._get_source_prayer_times(icci, date(2024, 1, 12))
+    assert not coordinator_instance.stale
+
+
+@pytest.mark.asyncio
+async def test_wp_plugin_month_downloaded_once(coordinator_instance, monkeypatch):
+    """
+    Test that a Daily Prayer Time site is queried once for the whole month,
+    and that the parsed days are kept in the persisted source cache.
+    """
+    month = dt_util.now().date().replace(day=1)
+    urls = []
+
+    async def fake_fetch(session, url, validators, stats=None):
+        urls.append(url)
+        return dummy_wp_plugin_month(month), {}
+
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fake_fetch)
+    coordinator_instance.cache._loaded = True
+    mcnd = sources.SOURCE_ADAPTERS["ie-mcnd"]
+    for day in range(1, 4):
+        prayer_times = await coordinator_instance._get_source_prayer_times(
+            mcnd, month.replace(day=day)
+        )
+        assert prayer_times["Dhuhr"] % 60 == 5
+    assert urls == [
+        "https://mcnd.ie/wp-json/dpt/v1/prayertime"
+        f"?filter=month&month={month.month}&year={month.year}"
+    ]
+    cached = coordinator_instance.cache.get_source("ie-mcnd")
+    assert cached["periods"][0]["start"] == month.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_wp_plugin_next_month_prefetched(coordinator_instance, monkeypatch):
+    """
+    Test that on the last day of a month the prefetch window takes the days of
+    the next month from the Daily Prayer Time site, not from the calculation.
+    """
+    urls = []
+
+    async def fake_fetch(session, url, validators, stats=None):
+        urls.append(url)
+        query = dict(param.split("=") for param in url.split("?")[1].split("&"))
+        month = date(int(query["year"]), int(query["month"]), 1)
+        return dummy_wp_plugin_month(month), {}
+
+    last_day = datetime(2024, 1, 31, 12, tzinfo=dt_util.UTC)
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: last_day)
+    monkeypatch.setattr(dt_util, "utcnow", lambda: last_day)
+    monkeypatch.setattr(coordinator, "async_get_clientsession", lambda hass: None)
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fake_fetch)
+    coordinator_instance.cache._loaded = True
+    coordinator_instance.config_entry.options[const.CONF_CALC_METHOD] = "ie-mcnd"
+    # Fetch from the source instead of the dummy prayer times.
+    del coordinator_instance._fetch_prayer_times
+    await coordinator_instance._async_fill_window(last_day.date())
+    tomorrow = coordinator_instance._window.day(date(2024, 2, 1))
+    assert tomorrow["Dhuhr"] == 13 * 60 + 5
+    assert coordinator_instance.fallback_count == 0
+    assert [url.split("?")[1] for url in urls] == [
+        "filter=month&month=1&year=2024",
+        "filter=month&month=2&year=2024",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_json_response_if_modified():
+    """
+    Test that JSON documents are fetched with aiohttp and that a conditional
+    request answered with 304 keeps the cached validators.
+    """
+
+    async def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response({"ok": True}, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/timetable", handler)
+    async with TestServer(app) as server, ClientSession() as session:
+        url = str(server.make_url("/timetable"))
+        source_stats = stats.SourceStats()
+        json_resp, validators = await coordinator.get_json_response_if_modified(
+            session, url, {}, stats=source_stats
+        )
+        assert json_resp == {"ok": True} and validators["etag"] == '"v1"'
+        json_resp, validators = await coordinator.get_json_response_if_modified(
+            session, url, validators, stats=source_stats
+        )
+        assert json_resp is None and validators["etag"] == '"v1"'
+    # Both requests are counted, only the first one had a body.
+    counters = source_stats.as_dict()
+    assert counters["requests"] == 2 and counters["failures"] == 0
+    assert counters["bytes"] == len('{"ok": true}')
+    assert counters["latency_histogram"]["<=0.1s"] == 2
+
+
+@pytest.mark.asyncio
+async def test_diagnostics(coordinator_instance, monkeypatch):
+    """
+    Test that the diagnostics report the source counters and fallbacks, and
+    that the diagnostic sensors read them.
+    """
+    monkeypatch.setattr(dt_util, "now", lambda time_zone=None: JANUARY_2024)
+    coordinator_instance.config_entry.options[const.CONF_CALC_METHOD] = "ie-icci"
+    coordinator_instance.config_entry.data = {CONF_LATITUDE: 53.35}
+    adapter = sources.SOURCE_ADAPTERS["ie-icci"]
+    source_stats = coordinator_instance.engine.source_stats(adapter.name)
+    fake_fetch = AsyncMock(return_value=(dummy_icci_timetable(), {"etag": '"1"'}))
+    monkeypatch.setattr(coordinator, "get_json_response_if_modified", fake_fetch)
+    for day in range(10, 13):
+        await coordinator_instance._get_source_prayer_times(adapter, date(2024, 1, day))
+    # A day outside of the timetable falls back to the ISNA calculation.
+    coordinator_instance._get_fallback_times(date(2023, 12, 31))
+    coordinator_instance.hass.data[const.DOMAIN] = {"test123": coordinator_instance}
+
+    result = await diagnostics.async_get_config_entry_diagnostics(
+        coordinator_instance.hass, coordinator_instance.config_entry
+    )
+    assert result["entry"]["data"][CONF_LATITUDE] == "**REDACTED**"
+    performance = result["performance"]
+    assert performance["sources"]["ie-icci"]["cache_misses"] == 1
+    assert performance["sources"]["ie-icci"]["cache_hits"] == 2
+    assert performance["sources"]["ie-icci"]["last_success"] is not None
+    assert performance["fallback_count"] == 1
+    assert source_stats.cache_hit_ratio == pytest.approx(2 / 3)
+
+    values = {
+        description.key: sensor.MuslimPrayerCompanionDiagnosticSensor(
+            coordinator_instance, description
+        ).native_value
+        for description in sensor.DIAGNOSTIC_SENSOR_TYPES
+    }
+    assert values["cache_hit_ratio"] == 66.7
+    assert values["fallback_count"] == 1
+    assert values["scheduled_timers"] == 0
+    # A timetable that always missed its cache reports 0%, not the requests.
+    source_stats.cache_hits = 0
+    coordinator_instance._coalescer.hits = 3
+    ratio_sensor = sensor.MuslimPrayerCompanionDiagnosticSensor(
+        coordinator_instance,
+        next(d for d in sensor.DIAGNOSTIC_SENSOR_TYPES if d.key == "cache_hit_ratio"),
+    )
+    assert ratio_sensor.native_value == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_refresh_bounds_concurrency():
+    """
+    Test that 500 sources refresh within the global and per host limits, that
+    the starts are spread over the window and that the run is reported.
+    """
+    limiter = bulk.FetchLimiter(limit=32, host_limit=2)
+    in_flight = {"total": 0, "max": 0}
+    per_host: dict[str, int] = {}
+    started: list[float] = []
+    loop = asyncio.get_running_loop()
+
+    async def fetch(url):
+        host = url.split("/")[2]
+        started.append(loop.time())
+        in_flight["total"] += 1
+        per_host[host] = per_host.get(host, 0) + 1
+        in_flight["max"] = max(in_flight["max"], in_flight["total"])
+        assert per_host[host] <= 2
+        await asyncio.sleep(0.001)
+        in_flight["total"] -= 1
+        per_host[host] -= 1
+        return True
+
+    limited = limiter.limit(fetch)
+    jobs = [
+        partial(limited, f"https://mosque{index % 50}.example/timetable")
+        for index in range(500)
+    ]
+    report = await bulk.async_bulk_refresh(jobs, window=0.5)
+    assert report.refreshed == 500 and report.failed == 0
+    assert in_flight["max"] <= 32
+    assert 0.4 < max(started) - min(started) < report.seconds < 5
+    assert report.per_second > 100
+    assert report.p50 <= report.p99
+    assert bulk.spread_delays(4, 60, 0.5) == [7.5, 22.5, 37.5, 52.5]
+
+
+@pytest.mark.asyncio
+async def test_request_coalescer_single_flight(monkeypatch):
+    """
+    Test that concurrent and repeated requests for the same key share a single
+    upstream call until its result expires.
+    """
+    clock = [1000.0]
+    monkeypatch.setattr(coalesce.time, "monotonic", lambda: clock[0])
+    coalescer = coalesce.RequestCoalescer(max_age=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"Fajr": "05:00"}
+
+    key = (51.5, -0.1, "ie-icci", date(2024, 3, 15))
+    results = await asyncio.gather(*(coalescer.async_run(key, fetch) for _ in range(5)))
+    assert all(result == {"Fajr": "05:00"} for result in results)
+    await coalescer.async_run(key, fetch)
+    assert len(calls) == 1
+    clock[0] += 30
+    await coalescer.async_run((*key[:3], date(2024, 3, 16)), fetch)
+    await coalescer.async_run(key, fetch)
+    assert len(calls) == 2
+    clock[0] += 30
+    await coalescer.async_run(key, fetch)
+    assert len(calls) == 3
+
+
+def test_local_hijri_conversion():
+    """
+    Test the Umm al-Qura table lookup, the bulk conversion, the moon sighting
+    adjustment and the tabular fallback outside of the table.
+    """
+    assert hijri.to_hijri(date(2024, 3, 11)) == (1445, 9, 1)
+    assert hijri.to_hijri(date(2024, 3, 11), adjustment=-1) == (1445, 8, 29)
+    info = hijri.hijri_date_info(date(2024, 3, 20))
+    assert info["hijri_date"] == "10-09-1445"
+    assert info["hijri_month_num"] == 9
+    assert info["hijri_day_month_readable"] == "10-Ramadhan"
+
+    start = date(2024, 1, 1)
+    bulk = hijri.to_hijri_range(start, 800)
+    assert bulk[70] == hijri.to_hijri(start + timedelta(days=70))
+    assert bulk[-1] == hijri.to_hijri(start + timedelta(days=799))
+
+    # Outside of the Umm al-Qura table, within a day or two of the tabular date.
+    assert hijri.to_hijri(date(1900, 1, 1))[:2] == (1317, 8)
+
+
+def test_hijri_conversion_runs_on_past_the_table():
+    """
+    Test that the tabular fallback continues from the last day of the Umm
+    al-Qura table without skipping or repeating a day.
+    """
+    last_day = date(2077, 11, 16)
+    assert hijri.to_hijri(last_day) == (1500, 12, 30)
+    assert hijri.to_hijri(last_day + timedelta(days=1)) == (1501, 1, 1)
+    assert hijri.to_hijri(last_day + timedelta(days=2)) == (1501, 1, 2)
+    days = hijri.to_hijri_range(last_day - timedelta(days=40), 80)
+    assert all(
+        (later.year, later.month, later.day)
+        in {
+            (earlier.year, earlier.month, earlier.day + 1),
+            (earlier.year, earlier.month + 1, 1),
+            (earlier.year + 1, 1, 1),
+        }
+        for earlier, later in pairwise(days)
+    )
+
+
 def test_sensor_native_value(coordinator_instance):
     """
     Test that the sensor entity returns a valid datetime object as native_value
@@ -88,6 +887,98 @@ def test_sensor_native_value(coordinator_instance):
     assert isinstance(native_value, datetime)
 
 
+@pytest.mark.asyncio
+async def test_sensor_skips_unchanged_state(coordinator_instance):
+    """
+    Test that sensors only write their state when their own key changed in
+    the data published by the coordinator.
+    """
+    fajr = sensor.MuslimPrayerCompanionTimeSensor(
+        coordinator_instance, sensor.SENSOR_TYPES[0]
+    )
+    hijri = sensor.MuslimPrayerCompanionTimeSensor(
+        coordinator_instance,
+        next(d for d in sensor.SENSOR_TYPES if d.key == "hijri_date"),
+    )
+    fajr.async_write_ha_state = MagicMock()
+    hijri.async_write_ha_state = MagicMock()
+    coordinator_instance.async_add_listener(fajr._handle_coordinator_update)
+    coordinator_instance.async_add_listener(hijri._handle_coordinator_update)
+
+    data = await coordinator_instance._async_update_data()
+    coordinator_instance.async_set_updated_data(data)
+    assert fajr.async_write_ha_state.call_count == 1
+    assert hijri.async_write_ha_state.call_count == 1
+
+    # Same data again: nothing to write.
+    coordinator_instance.async_set_updated_data(dict(data))
+    assert fajr.async_write_ha_state.call_count == 1
+
+    # Only Fajr changed.
+    coordinator_instance.async_set_updated_data(
+        {**data, "Fajr": data["Fajr"] + timedelta(minutes=1)}
+    )
+    assert fajr.async_write_ha_state.call_count == 2
+    assert hijri.async_write_ha_state.call_count == 1
+
+
+def test_integration_import_is_lazy():
+    """
+    Test that importing the integration, its config flow and its trigger
+    platform leaves numpy and the coordinator to the first setup or trigger,
+    which import them in the executor.
+    """
+    code = (
+        "import sys, custom_components.muslim_prayer_companion.config_flow\n"
+        "import custom_components.muslim_prayer_companion.trigger\n"
+        "print('numpy' in sys.modules, "
+        "'custom_components.muslim_prayer_companion.coordinator' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+@pytest.mark.asyncio
+async def test_config_entry_migrates_method_label(fake_hass):
+    """
+    Test that version 1 entries, which stored the label of the calculation
+    method, are migrated to the method itself.
+    """
+    entry = create_fake_config_entry()
+    entry.version = 1
+    entry.data = {
+        const.CONF_CALC_METHOD: "Ireland - Muslim Community North Dublin (MCND)"
+    }
+    fake_hass.config_entries.async_entry_for_domain_unique_id.return_value = None
+    assert await integration.async_migrate_entry(fake_hass, entry)
+    fake_hass.config_entries.async_update_entry.assert_called_once_with(
+        entry,
+        data={const.CONF_CALC_METHOD: "ie-mcnd"},
+        unique_id="51.5100,-0.1300,ie-mcnd",
+        version=2,
+    )
+    # An entry that already has the migrated unique id is not duplicated.
+    fake_hass.config_entries.async_update_entry.reset_mock()
+    fake_hass.config_entries.async_entry_for_domain_unique_id.return_value = (
+        create_fake_config_entry(entry_id="test456")
+    )
+    assert not await integration.async_migrate_entry(fake_hass, entry)
+    fake_hass.config_entries.async_update_entry.assert_not_called()
+
+
+def test_unknown_method_is_not_computed_as_isna():
+    """Test that an unknown calculation method is refused, not computed as ISNA."""
+    assert calculation.get_method_params("mwl").fajr_angle == 18
+    with pytest.raises(ValueError, match="Muslim World League"):
+        calculation.get_method_params("Muslim World League (MWL)")
+
+
 @pytest.mark.asyncio
 async def test_config_flow(fake_hass):
     """
@@ -95,9 +986,22 @@ async def test_config_flow(fake_hass):
     The expected result is that an entry is created with the provided data.
     """
     flow = config_flow.MuslimPrayerCompanionConfigFlow()
+    flow.hass = fake_hass
+    flow.context = {}
+    # No entry is configured yet.
+    fake_hass.config_entries.async_entry_for_domain_unique_id.return_value = None
+    fake_hass.config_entries.async_entries.return_value = []
+    fake_hass.config_entries.flow.async_progress_by_handler.return_value = []
+    # The form stores the method, not the label shown for it.
+    with pytest.raises(vol.Invalid):
+        config_flow.DATA_SCHEMA(
+            {"calculation_method": const.CALC_METHOD_LABELS[const.DEFAULT_CALC_METHOD]}
+        )
     # Simulate a user input with the default calculation method.
-    user_input = {"calculation_method": const.DEFAULT_CALC_METHOD}
+    user_input = config_flow.DATA_SCHEMA({})
     result = await flow.async_step_user(user_input)
     # The flow should create an entry.
     assert result["type"] == "create_entry"
     assert result["data"] == user_input
+    # Entries are unique per grid cell and method.
+    assert flow.unique_id == "51.5100,-0.1300,ie-icci"